@@ -1,11 +1,34 @@
-from fastapi import FastAPI, UploadFile, File, Query
+from fastapi import FastAPI, UploadFile, File, Query, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
+from fastapi.responses import JSONResponse, PlainTextResponse, Response
 from pydantic import BaseModel
 from pathlib import Path
 from datetime import date, datetime
+from concurrent.futures import ThreadPoolExecutor
+import os
 import shutil
 
+from app.media_processing.thumbnails import (
+    build_thumbnails,
+    existing_thumbnails,
+    remove_thumbnails,
+)
+from app.server.conditional import etag_matches, make_etag
+from app.server.day_index import DayIndex, paginate
+from app.server.delivery import resolve_static, serve_file, static_url
+from app.server.jobs import Job, JobQueue
+from app.server.scheduler import WrapupScheduler
+from app.server.uploads import (
+    ResumableUploads,
+    UploadNotFound,
+    UploadOffsetMismatch,
+    save_upload_file,
+)
+from app.utils.logs import configure_logging
+from app.utils.metrics import REGISTRY
+
+configure_logging()
+
 ROOT = Path(".")
 DAY_MEDIA_DIR = ROOT / "day_media"
 STATIC_DIR = ROOT / "static"
@@ -26,15 +49,60 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-app.mount("/static", StaticFiles(directory=str(ROOT)), name="static")
+def build_static_url(path: Path) -> str:
+    return static_url(path, ROOT)
 
-IMAGE_EXTS = {".jpg", ".jpeg", ".png"}
-VIDEO_EXTS = {".mp4", ".mov"}
 
+# only media and rendered output are served; the rest of ROOT (.env,
+# caches, job store) is not
+STATIC_ROOTS = (DAY_MEDIA_DIR, STATIC_DIR)
 
-def build_static_url(path: Path) -> str:
-    rel = path.relative_to(ROOT)
-    return f"/static/{rel.as_posix()}"
+
+@app.api_route("/static/{rel_path:path}", methods=["GET", "HEAD"])
+def static_file(rel_path: str, request: Request, v: str | None = None):
+    """
+    Media and wrap-up delivery with Range/206 support and strong ETags.
+    URLs from build_static_url carry ?v=<version> and are cached as immutable.
+    """
+    path = resolve_static(rel_path, ROOT, STATIC_ROOTS)
+    if path is None:
+        raise HTTPException(status_code=404, detail="not found")
+    return serve_file(request, path, version=v)
+
+
+def _thumbnail_urls(path: Path) -> dict | None:
+    thumbs = existing_thumbnails(path)
+    if thumbs is None:
+        return None
+    return {size: build_static_url(p) for size, p in thumbs.items()}
+
+
+DAY_INDEX = DayIndex(DAY_MEDIA_DIR, STATIC_DIR, build_static_url, _thumbnail_urls)
+
+
+def _conditional_json(request: Request, etag: str, payload) -> Response:
+    """200 with an ETag, or an empty 304 when the client already has it."""
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(payload() if callable(payload) else payload, headers=headers)
+
+
+def _page(listing, cursor: str | None, limit: int | None, descending: bool = False):
+    try:
+        return paginate(listing, cursor, limit, descending=descending)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def _parse_day(day: str | None) -> str:
+    """`day` as YYYY-MM-DD (default: today); 400 for anything else."""
+    if day is None:
+        return date.today().isoformat()
+    try:
+        return date.fromisoformat(day).isoformat()
+    except ValueError:
+        raise HTTPException(status_code=400, detail="day must be YYYY-MM-DD")
 
 
 def get_day_folder(day: str) -> Path:
@@ -43,51 +111,137 @@ def get_day_folder(day: str) -> Path:
     return f
 
 
+# upload-time thumbnails and proxy encodes; a small fixed pool so a burst
+# of uploads queues up here instead of running that many ffmpegs at once
+DERIVATIVES = ThreadPoolExecutor(
+    max_workers=int(os.getenv("PROXY_WORKERS", "2")),
+    thread_name_prefix="derivatives",
+)
+
+
+def _build_derivatives(path: Path) -> None:
+    """Background work after a file lands: thumbnails for the grid, then the render proxy."""
+    from app.video_composer.proxies import build_proxy
+
+    if build_thumbnails(path) is not None:
+        DAY_INDEX.invalidate_day(path.parent.name)
+    build_proxy(path)
+
+
+def _run_wrapup_job(job: Job, progress) -> str:
+    from main import run_daily_wrapup, get_wrapup_output_path
+
+    out_path = get_wrapup_output_path(job.day)
+    try:
+        return run_daily_wrapup(
+            output_path=out_path,
+            day=job.day,
+            progress=progress,
+            force_new_poem=job.force,
+        )
+    finally:
+        # new wrap-up, and the render may have pruned other days' thumbnails
+        DAY_INDEX.invalidate_all()
+
+
+JOBS = JobQueue(_run_wrapup_job, store_path=ROOT / "jobs.json")
+
+
+def _wrapup_is_stale(day: str) -> bool:
+    from main import wrapup_is_stale
+
+    return wrapup_is_stale(day)
+
+
+def _media_days() -> list[str]:
+    from main import list_media_days
+
+    return list_media_days()
+
+
+SCHEDULER = WrapupScheduler(
+    submit=JOBS.submit,
+    is_stale=_wrapup_is_stale,
+    media_days=_media_days,
+)
+
+
+@app.on_event("startup")
+def _restore_jobs():
+    JOBS.restore()
+    SCHEDULER.start()
+
+
+@app.on_event("shutdown")
+def _stop_jobs():
+    SCHEDULER.stop()
+    JOBS.shutdown(wait=False)
+    DERIVATIVES.shutdown(wait=False, cancel_futures=True)
+
+
+def _job_payload(job: Job) -> dict:
+    data = job.to_dict()
+    data["video_url"] = (
+        build_static_url(Path(job.output_path)) if job.output_path else None
+    )
+    return data
+
+
+@app.get("/metrics")
+def metrics():
+    """Prometheus text exposition of pipeline and job metrics."""
+    return PlainTextResponse(
+        REGISTRY.render_prometheus(),
+        media_type="text/plain; version=0.0.4",
+    )
+
+
 @app.post("/upload_media")
 async def upload_media(file: UploadFile = File(...)):
     today = date.today().isoformat()
     folder = get_day_folder(today)
 
-    dest = folder / file.filename
-    with dest.open("wb") as f:
-        f.write(await file.read())
+    dest = folder / Path(file.filename).name
+    size, sha256 = await save_upload_file(file, dest)
+    DAY_INDEX.invalidate_day(today)
+    DERIVATIVES.submit(_build_derivatives, dest)
+
+    return {"status": "ok", "path": str(dest), "size": size, "sha256": sha256}
 
-    return {"status": "ok", "path": str(dest)}
 
+# Listing endpoints are polled by the app after every capture. They are
+# served from DAY_INDEX and answer If-None-Match with 304.
 
 @app.get("/today_stats")
-def today_stats():
+def today_stats(request: Request):
     today = date.today().isoformat()
-    folder = get_day_folder(today)
+    listing = DAY_INDEX.media(today)
 
-    photos = sum(1 for f in folder.iterdir() if f.suffix.lower() in IMAGE_EXTS)
-    videos = sum(1 for f in folder.iterdir() if f.suffix.lower() in VIDEO_EXTS)
+    def payload():
+        photos = sum(1 for m in listing.items if m["type"] == "photo")
+        return {"date": today, "photos": photos, "videos": len(listing.items) - photos}
 
-    return {"date": today, "photos": photos, "videos": videos}
+    return _conditional_json(request, make_etag("stats", listing.etag, weak=True), payload)
 
 
 @app.get("/today_media")
-def today_media():
-    today = date.today().isoformat()
-    folder = get_day_folder(today)
-
-    items = []
-    for f in folder.iterdir():
-        ext = f.suffix.lower()
-        if ext in IMAGE_EXTS:
-            t = "photo"
-        elif ext in VIDEO_EXTS:
-            t = "video"
-        else:
-            continue
+def today_media(
+    request: Request,
+    cursor: str | None = None,
+    limit: int | None = Query(None, ge=1, le=500),
+):
+    """
+    Today's captures, oldest first. Without `limit` everything is returned;
+    otherwise pass `next_cursor` back as `cursor` for the following page.
+    """
+    listing = DAY_INDEX.media(date.today().isoformat())
+    etag = make_etag("media", listing.etag, cursor, limit, weak=True)
 
-        items.append({
-            "id": str(f.relative_to(ROOT)),
-            "type": t,
-            "url": build_static_url(f),
-        })
+    def payload():
+        items, next_cursor = _page(listing, cursor, limit)
+        return {"items": items, "next_cursor": next_cursor}
 
-    return {"items": items}
+    return _conditional_json(request, etag, payload)
 
 
 class DeleteBody(BaseModel):
@@ -96,79 +250,104 @@ class DeleteBody(BaseModel):
 
 @app.post("/delete_media")
 def delete_media(body: DeleteBody):
+    from app.video_composer.proxies import proxy_path
+
     p = ROOT / body.id
     if p.exists():
+        remove_thumbnails(p)
         p.unlink()
+        proxy_path(p).unlink(missing_ok=True)
+        DAY_INDEX.invalidate_day(p.parent.name)
         return {"status": "deleted"}
     return {"status": "not_found"}
 
 
 @app.post("/generate_wrapup")
 def generate_wrapup(force: bool = Query(False), day: str | None = None):
-    from main import run_daily_wrapup, get_wrapup_output_path
-
+    """
+    Queue a wrap-up render and return immediately.
+    Poll /jobs/{job_id} (or /wrapup_status) for progress.
+    `force` writes a new poem instead of reusing the cached one.
+    """
     target_day = day or date.today().isoformat()
-    out_path = get_wrapup_output_path(target_day)
+    job = JOBS.submit(target_day, force=force)
+
+    return {
+        "status": job.status,
+        "job_id": job.id,
+        "status_url": f"/jobs/{job.id}",
+    }
 
-    result = run_daily_wrapup(output_path=out_path, day=target_day)
-    if not result:
-        return {"status": "no_media"}
 
-    return {"status": "ok", "video_url": build_static_url(out_path)}
+@app.get("/jobs/{job_id}")
+def job_status(job_id: str):
+    job = JOBS.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="job not found")
+    return _job_payload(job)
 
 @app.delete("/wrapup_today")
 def delete_wrapup(day: str | None = None):
-    from main import get_wrapup_output_path
+    from app.video_composer.hls import remove_hls
+    from main import get_wrapup_hls_dir, get_wrapup_output_path
     target = day or date.today().isoformat()
     p = get_wrapup_output_path(target)
+    remove_hls(get_wrapup_hls_dir(target))
     if p.exists():
+        remove_thumbnails(p)
         p.unlink()
+        DAY_INDEX.invalidate_wrapups()
         return {"status": "deleted"}
     return {"status": "not_found"}
 
 @app.get("/wrapup_status")
 def wrapup_status(day: str | None = None):
-    from main import get_wrapup_output_path
-    target = day or date.today().isoformat()
+    from app.video_composer.hls import PLAYLIST_NAME
+    from main import get_wrapup_hls_dir, get_wrapup_output_path
+    target = _parse_day(day)
     out = get_wrapup_output_path(target)
+    playlist = get_wrapup_hls_dir(target) / PLAYLIST_NAME
 
     exists = out.exists()
+    job = JOBS.latest_for_day(target)
 
     return {
         "date": target,
         "video_exists": exists,
-        "after_schedule": True,  # SIMPLE MODE
-        "scheduled_time": "23:30",
-        "video_url": build_static_url(out) if exists else None
+        "after_schedule": SCHEDULER.after_schedule(target),
+        "scheduled_time": SCHEDULER.scheduled_time,
+        "is_stale": _wrapup_is_stale(target),
+        "scheduler": SCHEDULER.status(),
+        "video_url": build_static_url(out) if exists else None,
+        "hls_url": build_static_url(playlist) if exists and playlist.exists() else None,
+        "job": _job_payload(job) if job else None,
     }
 @app.get("/past_days")
-def past_days():
-    days = []
-    for f in STATIC_DIR.glob("timecapsule_*.mp4"):
-        name = f.stem.split("_")
-        if len(name) == 2:
-            days.append(name[1])
-
-    days.sort(reverse=True)
-
-    return {"days": [{"date": d} for d in days]}
-
-@app.post("/register_imported_media")
-async def register_imported_media(file: UploadFile = File(...)):
-    """
-    Called by: ApiService.registerImportedMedia(path: file.path)
-
-    Expects a multipart/form-data upload with a single field named "file".
-    Saves it under: day_media/<today>/HHMMSS_micro.ext
-    """
+def past_days(
+    request: Request,
+    cursor: str | None = None,
+    limit: int | None = Query(None, ge=1, le=500),
+):
+    """Days with a rendered wrap-up, newest first; paginated like /today_media."""
+    listing = DAY_INDEX.wrapups()
+    etag = make_etag("days", listing.etag, cursor, limit, weak=True)
+
+    def payload():
+        days, next_cursor = _page(listing, cursor, limit, descending=True)
+        return {"days": days, "next_cursor": next_cursor}
+
+    return _conditional_json(request, etag, payload)
+
+def _imported_media_dest(filename: str | None, content_type: str | None) -> Path:
+    """day_media/<today>/HHMMSS_micro.ext, guessing ext from content type."""
     today_str = date.today().isoformat()
     day_dir = DAY_MEDIA_ROOT / today_str
     day_dir.mkdir(parents=True, exist_ok=True)
 
-    original_name = file.filename or "capture"
+    original_name = filename or "capture"
     ext = Path(original_name).suffix.lower()
     if not ext:
-        ct = (file.content_type or "").lower()
+        ct = (content_type or "").lower()
         if ct.startswith("image/"):
             ext = ".jpg"
         elif ct.startswith("video/"):
@@ -176,12 +355,93 @@ async def register_imported_media(file: UploadFile = File(...)):
         else:
             ext = ".bin"
     ts = datetime.now().strftime("%H%M%S_%f")
-    dest = day_dir / f"{ts}{ext}"
-    data = await file.read()
-    dest.write_bytes(data)
+    return day_dir / f"{ts}{ext}"
+
+
+@app.post("/register_imported_media")
+async def register_imported_media(file: UploadFile = File(...)):
+    """
+    Called by: ApiService.registerImportedMedia(path: file.path)
+
+    Expects a multipart/form-data upload with a single field named "file".
+    Saves it under: day_media/<today>/HHMMSS_micro.ext
+    """
+    dest = _imported_media_dest(file.filename, file.content_type)
+    size, sha256 = await save_upload_file(file, dest)
+    DAY_INDEX.invalidate_day(dest.parent.name)
+    DERIVATIVES.submit(_build_derivatives, dest)
 
     return {
       "status": "ok",
       "saved_path": str(dest),
-      "date": today_str,
+      "date": dest.parent.name,
+      "size": size,
+      "sha256": sha256,
+    }
+
+
+# ---------- resumable chunked uploads ----------
+# POST /uploads                       -> {upload_id, offset: 0}
+# PUT  /uploads/{id}?offset=N  <body> -> {offset}   (409 + offset on mismatch)
+# GET  /uploads/{id}                  -> {offset}   (where to resume)
+# POST /uploads/{id}/finalize         -> saved_path, sha256
+
+UPLOADS = ResumableUploads(ROOT / ".uploads")
+
+
+class UploadInitBody(BaseModel):
+    filename: str | None = None
+    content_type: str | None = None
+    total_size: int | None = None
+
+
+def _get_upload_status(upload_id: str) -> dict:
+    try:
+        return UPLOADS.status(upload_id)
+    except UploadNotFound:
+        raise HTTPException(status_code=404, detail="upload not found")
+
+
+@app.post("/uploads")
+def init_upload(body: UploadInitBody):
+    return UPLOADS.init(body.filename, body.content_type, body.total_size)
+
+
+@app.get("/uploads/{upload_id}")
+def upload_status(upload_id: str):
+    return _get_upload_status(upload_id)
+
+
+@app.put("/uploads/{upload_id}")
+async def append_upload_chunk(upload_id: str, request: Request, offset: int = Query(...)):
+    try:
+        new_offset = await UPLOADS.append(upload_id, offset, request.stream())
+    except UploadNotFound:
+        raise HTTPException(status_code=404, detail="upload not found")
+    except UploadOffsetMismatch as e:
+        raise HTTPException(status_code=409, detail={"offset": e.expected})
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"upload_id": upload_id, "offset": new_offset}
+
+
+@app.post("/uploads/{upload_id}/finalize")
+async def finalize_upload(upload_id: str):
+    status = _get_upload_status(upload_id)
+    dest = _imported_media_dest(status.get("filename"), status.get("content_type"))
+    try:
+        size, sha256 = await UPLOADS.finalize(upload_id, dest)
+    except UploadNotFound:
+        raise HTTPException(status_code=404, detail="upload not found")
+    except UploadOffsetMismatch as e:
+        raise HTTPException(status_code=409, detail={"offset": e.expected})
+    DAY_INDEX.invalidate_day(dest.parent.name)
+    DERIVATIVES.submit(_build_derivatives, dest)
+
+    return {
+        "status": "ok",
+        "saved_path": str(dest),
+        "date": dest.parent.name,
+        "size": size,
+        "sha256": sha256,
     }
@@ -0,0 +1,144 @@
+from __future__ import annotations
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+from pathlib import Path
+
+import numpy as np
+
+from app.media_processing.hashing import hamming_distances
+from app.utils.sqlite_cache import SqliteCache
+
+log = logging.getLogger(__name__)
+
+CAPTION_CACHE_DB = Path(os.getenv("CAPTION_CACHE_DB", "caption_cache.sqlite3"))
+# legacy whole-file cache, imported once into the SQLite store
+LEGACY_CAPTION_CACHE_JSON = Path("caption_cache.json")
+
+_CACHE: "CaptionCache | None" = None
+_CACHE_LOCK = threading.Lock()
+
+
+def _to_signed64(value: int) -> int:
+    # SQLite INTEGER is signed 64-bit
+    return value - (1 << 64) if value >= (1 << 63) else value
+
+
+class CaptionCache(SqliteCache):
+    """
+    Captions keyed by content hash, plus a perceptual-hash index so
+    near-duplicate photos can reuse an existing caption.
+    """
+
+    def __init__(self, *args, **kwargs):
+        # in-memory copy of the phashes table, loaded on first lookup;
+        # set up before the base class creates the schema and evicts
+        self._phash_lock = threading.Lock()
+        self._phash_keys: list[str] | None = None
+        self._phash_values: np.ndarray | None = None
+        # key -> its position in _phash_keys / _phash_values
+        self._phash_pos: dict[str, int] = {}
+        super().__init__(*args, **kwargs)
+
+    def _create_schema(self, conn: sqlite3.Connection) -> None:
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS phashes (key TEXT PRIMARY KEY, phash INTEGER NOT NULL)"
+        )
+
+    def _load_phashes(self) -> None:
+        rows = self._conn().execute("SELECT key, phash FROM phashes").fetchall()
+        self._phash_keys = [k for k, _ in rows]
+        self._phash_values = np.array([h for _, h in rows], dtype=np.int64).view(np.uint64)
+        self._phash_pos = {k: n for n, k in enumerate(self._phash_keys)}
+
+    def put_phash(self, key: str, phash: int) -> None:
+        with self._conn() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO phashes (key, phash) VALUES (?, ?)",
+                (key, _to_signed64(phash)),
+            )
+        with self._phash_lock:
+            if self._phash_keys is None:
+                return
+            pos = self._phash_pos.get(key)
+            if pos is None:
+                self._phash_pos[key] = len(self._phash_keys)
+                self._phash_keys.append(key)
+                self._phash_values = np.append(
+                    self._phash_values, np.uint64(phash)
+                )
+            else:
+                # copy: find_similar may be reading the old array unlocked
+                values = self._phash_values.copy()
+                values[pos] = np.uint64(phash)
+                self._phash_values = values
+
+    def find_similar(self, phash: int, max_distance: int) -> str | None:
+        """Caption of the closest indexed image within `max_distance` bits."""
+        with self._phash_lock:
+            if self._phash_keys is None:
+                self._load_phashes()
+            keys, values = self._phash_keys, self._phash_values
+        if not keys:
+            return None
+        dists = hamming_distances(values, phash)
+        for idx in np.argsort(dists, kind="stable"):
+            if dists[idx] > max_distance:
+                break
+            caption = self.get(keys[idx])
+            if caption is not None:
+                return caption
+        return None
+
+    def evict(self) -> int:
+        removed = super().evict()
+        if removed:
+            with self._conn() as conn:
+                conn.execute(
+                    f"DELETE FROM phashes WHERE key NOT IN (SELECT key FROM {self.table})"
+                )
+            with self._phash_lock:
+                self._phash_keys = None
+                self._phash_values = None
+                self._phash_pos = {}
+        return removed
+
+    def migrate_from_json(self, json_path: Path) -> int:
+        """Import entries from the old caption_cache.json (only once)."""
+        if self.get_meta("migrated_json") or not json_path.exists():
+            return 0
+        try:
+            data = json.loads(json_path.read_text(encoding="utf-8"))
+        except Exception as e:
+            log.warning("Failed to read legacy caption cache", extra={"error": str(e)})
+            return 0
+        entries = {str(k): str(v) for k, v in data.items()}
+        if entries:
+            self.put_many(entries)
+        self.set_meta("migrated_json", str(json_path))
+        log.info("Migrated legacy caption cache", extra={"entries": len(entries), "source": str(json_path)})
+        return len(entries)
+
+
+def get_caption_cache() -> CaptionCache:
+    """
+    Shared caption cache.
+    CAPTION_CACHE_MAX_ENTRIES / CAPTION_CACHE_MAX_AGE_DAYS bound its size
+    (0 disables the limit).
+    """
+    global _CACHE
+    with _CACHE_LOCK:
+        if _CACHE is None:
+            max_entries = int(os.getenv("CAPTION_CACHE_MAX_ENTRIES", "50000"))
+            max_age_days = float(os.getenv("CAPTION_CACHE_MAX_AGE_DAYS", "365"))
+            _CACHE = CaptionCache(
+                CAPTION_CACHE_DB,
+                table="captions",
+                max_entries=max_entries,
+                max_age_s=max_age_days * 86400,
+            )
+            _CACHE.migrate_from_json(LEGACY_CAPTION_CACHE_JSON)
+        return _CACHE
@@ -0,0 +1,40 @@
+from __future__ import annotations
+
+import hashlib
+from pathlib import Path
+
+import numpy as np
+from PIL import Image, ImageOps
+
+_CHUNK = 1 << 20
+
+
+def file_sha256(path: str | Path) -> str:
+    """Hex SHA-256 of the file contents (streamed, constant memory)."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(_CHUNK), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def dhash(path: str | Path) -> int:
+    """
+    64-bit difference hash of an image: grayscale, shrink to 9x8 and
+    compare horizontally adjacent pixels. Near-identical shots (same scene,
+    small shifts or exposure changes) end up only a few bits apart.
+    """
+    with Image.open(path) as img:
+        # decode at reduced scale; we only need a tiny thumbnail
+        img.draft("L", (64, 64))
+        img = ImageOps.exif_transpose(img).convert("L")
+        small = img.resize((9, 8), Image.LANCZOS)
+    pixels = np.asarray(small, dtype=np.int16)
+    bits = (pixels[:, 1:] > pixels[:, :-1]).flatten()
+    return int(np.packbits(bits).view(">u8")[0])
+
+
+def hamming_distances(hashes: np.ndarray, target: int) -> np.ndarray:
+    """Bit distance between `target` and every uint64 hash in `hashes`."""
+    xor = np.bitwise_xor(hashes.astype(np.uint64), np.uint64(target))
+    return np.unpackbits(xor.view(np.uint8).reshape(-1, 8), axis=1).sum(axis=1)
@@ -0,0 +1,152 @@
+from __future__ import annotations
+
+import logging
+import os
+import subprocess
+from dataclasses import dataclass
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from app.media_processing.probe import probe_video
+from app.utils.helpers import ffmpeg_exe
+
+log = logging.getLogger(__name__)
+
+# frames sent to Gemini per clip
+VIDEO_KEYFRAMES = int(os.getenv("VIDEO_KEYFRAMES", "3"))
+# long edge of decoded frames; enough for a caption, cheap to scale to
+KEYFRAME_MAX_EDGE = int(os.getenv("KEYFRAME_MAX_EDGE", "512"))
+# analysis sampling: at most this rate, and at most this many frames per clip
+KEYFRAME_SAMPLE_FPS = float(os.getenv("KEYFRAME_SAMPLE_FPS", "2"))
+KEYFRAME_MAX_SAMPLES = int(os.getenv("KEYFRAME_MAX_SAMPLES", "60"))
+# clips longer than this only have their keyframes (I-frames) decoded
+KEYFRAME_ONLY_AFTER_S = float(os.getenv("KEYFRAME_ONLY_AFTER_S", "20"))
+
+# frames darker than this (0-255 mean) are fade-ins / covered lenses
+_DARK_MEAN = 16.0
+_SIG_SIZE = (32, 32)
+
+
+@dataclass
+class Keyframe:
+    time_s: float
+    frame: np.ndarray  # BGR, long edge <= KEYFRAME_MAX_EDGE
+    score: float = 0.0
+
+
+def _output_size(width: int, height: int, max_edge: int) -> tuple[int, int]:
+    scale = min(1.0, max_edge / max(width, height))
+    # even dimensions keep every pixel format happy
+    w = max(2, int(round(width * scale / 2)) * 2)
+    h = max(2, int(round(height * scale / 2)) * 2)
+    return w, h
+
+
+def sample_frames(
+    path: str | Path,
+    duration: float,
+    size: tuple[int, int],
+    max_edge: int = KEYFRAME_MAX_EDGE,
+) -> list[Keyframe]:
+    """
+    Decode a video once with ffmpeg into small BGR frames, sampled at
+    min(KEYFRAME_SAMPLE_FPS, KEYFRAME_MAX_SAMPLES / duration). `size` is
+    the display size (ffmpeg applies rotation before scaling). Long clips
+    skip non-key frames entirely, so the cost per clip stays bounded.
+    """
+    w, h = _output_size(size[0], size[1], max_edge)
+    rate = min(KEYFRAME_SAMPLE_FPS, KEYFRAME_MAX_SAMPLES / max(duration, 1e-3))
+    cmd = [ffmpeg_exe(), "-v", "error", "-nostdin"]
+    if duration > KEYFRAME_ONLY_AFTER_S:
+        cmd += ["-skip_frame", "nokey"]
+    cmd += [
+        "-i", str(path),
+        "-an",
+        "-vf", f"fps={rate:.4f},scale={w}:{h}",
+        "-f", "rawvideo", "-pix_fmt", "bgr24", "-",
+    ]
+
+    frame_bytes = w * h * 3
+    frames: list[Keyframe] = []
+    with subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE) as proc:
+        while len(frames) < KEYFRAME_MAX_SAMPLES + 1:
+            buf = proc.stdout.read(frame_bytes)
+            if len(buf) < frame_bytes:
+                break
+            frame = np.frombuffer(buf, np.uint8).reshape(h, w, 3)
+            frames.append(Keyframe(time_s=len(frames) / rate, frame=frame))
+        proc.kill()
+        stderr = proc.stderr.read().decode("utf-8", "replace")
+    if not frames:
+        raise RuntimeError(f"No frames decoded from {path}: {stderr.strip()[-500:]}")
+    return frames
+
+
+def _signature(frame: np.ndarray) -> np.ndarray:
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    return cv2.resize(gray, _SIG_SIZE, interpolation=cv2.INTER_AREA).astype(np.float32)
+
+
+def select_keyframes(frames: list[Keyframe], k: int) -> list[Keyframe]:
+    """
+    Pick `k` representative frames: the opening shot plus the biggest scene
+    changes (mean absolute difference of tiny grayscale signatures), kept
+    apart in time, topped up with evenly spaced frames. Returned in time order.
+    """
+    if len(frames) <= k:
+        return list(frames)
+
+    sigs = [_signature(f.frame) for f in frames]
+    usable = [float(s.mean()) >= _DARK_MEAN for s in sigs]
+    for i, f in enumerate(frames):
+        f.score = float(np.abs(sigs[i] - sigs[i - 1]).mean()) if i else np.inf
+
+    span = frames[-1].time_s - frames[0].time_s
+    min_gap = span / (2 * k) if span > 0 else 0.0
+    chosen: list[int] = []
+    for i in sorted(range(len(frames)), key=lambda i: frames[i].score, reverse=True):
+        if len(chosen) == k:
+            break
+        if not usable[i]:
+            continue
+        if all(abs(frames[i].time_s - frames[j].time_s) >= min_gap for j in chosen):
+            chosen.append(i)
+
+    # static or mostly dark clips: fall back to even spacing
+    for pos in np.linspace(0, len(frames) - 1, k):
+        if len(chosen) == k:
+            break
+        i = int(round(pos))
+        if i not in chosen:
+            chosen.append(i)
+    return [frames[i] for i in sorted(chosen)]
+
+
+def extract_keyframes(
+    path: str | Path,
+    k: int | None = None,
+    duration: float | None = None,
+    size: tuple[int, int] | None = None,
+) -> list[Keyframe]:
+    """
+    Open `path` once and return up to `k` (default VIDEO_KEYFRAMES)
+    representative reduced-resolution frames. `duration` and display `size`
+    come from the loader when known; otherwise the file is probed.
+    """
+    k = VIDEO_KEYFRAMES if k is None else k
+    if duration is None or size is None:
+        info = probe_video(path)
+        if info is None or not info.width or not info.height:
+            raise RuntimeError(f"Could not probe {path}")
+        duration = info.duration if duration is None else duration
+        if size is None:
+            size = (info.height, info.width) if info.rotation in (90, 270) else (info.width, info.height)
+    frames = sample_frames(path, duration, size)
+    picked = select_keyframes(frames, k)
+    log.debug(
+        "Extracted keyframes",
+        extra={"src": str(path), "sampled": len(frames), "picked": [round(f.time_s, 2) for f in picked]},
+    )
+    return picked
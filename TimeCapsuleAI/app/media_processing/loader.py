@@ -2,13 +2,35 @@ from __future__ import annotations
 from dataclasses import dataclass
 from datetime import datetime
 from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
 from typing import Literal, Optional
+import json
+import logging
+import multiprocessing
+import os
+import threading
+import uuid
 import cv2
 import numpy as np
 from moviepy.editor import VideoFileClip
 from PIL import Image, ExifTags
-from app.utils.helpers import list_media_files
+from app.media_processing.hashing import file_sha256
+from app.media_processing.probe import VideoInfo, probe_video, probe_videos
+from app.utils.helpers import MEDIA_EXTS
+
+log = logging.getLogger(__name__)
 MediaType = Literal["image", "video"]
+IMAGE_EXTS = {".jpg", ".jpeg", ".png"}
+MANIFEST_NAME = ".manifest.json"
+MANIFEST_VERSION = 3
+# worker processes for metadata extraction (1 = serial)
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", str(min(os.cpu_count() or 1, 8))))
+# fewer new files than this are extracted inline; a pool isn't worth it
+INGEST_POOL_MIN_FILES = int(os.getenv("INGEST_POOL_MIN_FILES", "8"))
+
+_POOL: ProcessPoolExecutor | None = None
+_POOL_SIZE = 0
+_POOL_LOCK = threading.Lock()
 @dataclass
 class MediaItem:
     path: Path
@@ -16,7 +38,27 @@ class MediaItem:
     duration: float | None 
     taken_at: Optional[datetime] = None
     location: Optional[str] = None 
+    size: Optional[int] = None
+    mtime: Optional[float] = None
+    content_hash: Optional[str] = None
+    # video stream info from probe.py (None for images / unknown)
+    width: Optional[int] = None
+    height: Optional[int] = None
+    rotation: int = 0
+    fps: Optional[float] = None
+    # None when no probe could tell; treat as "may have audio"
+    has_audio: Optional[bool] = None
+
+    @property
+    def display_size(self) -> tuple[int, int] | None:
+        """(width, height) as shown, i.e. with rotation applied."""
+        if not self.width or not self.height:
+            return None
+        if self.rotation in (90, 270):
+            return self.height, self.width
+        return self.width, self.height
 def _get_video_duration(path: Path) -> float:
+    # last resort when neither the MP4 parser nor ffprobe can read the file
     with VideoFileClip(str(path)) as clip:
         return float(clip.duration)
 _EXIF_TAGS = {v: k for k, v in ExifTags.TAGS.items()}
@@ -49,8 +91,8 @@ def _extract_image_metadata(path: Path) -> tuple[Optional[datetime], Optional[st
     location: Optional[str] = None
 
     try:
-        img = Image.open(str(path))
-        exif = img._getexif()
+        with Image.open(str(path)) as img:
+            exif = img._getexif()
         if not exif:
             return taken_at, location
         dt_tag = _EXIF_TAGS.get("DateTimeOriginal") or _EXIF_TAGS.get("DateTime")
@@ -77,42 +119,195 @@ def _extract_image_metadata(path: Path) -> tuple[Optional[datetime], Optional[st
         pass
 
     return taken_at, location
-def load_day_media(root: str | Path) -> list[MediaItem]:
+def _scan_media(root: Path) -> list[tuple[Path, os.stat_result]]:
+    """All media files under root with a single stat() each."""
+    found: list[tuple[Path, os.stat_result]] = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        # skip our own hidden folders (.proxies, ...)
+        dirnames[:] = [d for d in dirnames if not d.startswith(".")]
+        for name in filenames:
+            if Path(name).suffix.lower() in MEDIA_EXTS:
+                p = Path(dirpath) / name
+                found.append((p, p.stat()))
+    return found
+
+
+def _load_manifest(root: Path) -> dict:
+    path = root / MANIFEST_NAME
+    if not path.exists():
+        return {}
+    try:
+        data = json.loads(path.read_text(encoding="utf-8"))
+    except Exception as e:
+        log.warning("Ignoring unreadable manifest", extra={"manifest": str(path), "error": str(e)})
+        return {}
+    if data.get("version") != MANIFEST_VERSION:
+        return {}
+    return data.get("items", {})
+
+
+def _save_manifest(root: Path, entries: dict) -> None:
+    path = root / MANIFEST_NAME
+    # unique per call: two threads (an upload and a render) can save at once
+    tmp = path.with_name(f"{MANIFEST_NAME}.{uuid.uuid4().hex}.tmp")
+    try:
+        tmp.write_text(
+            json.dumps({"version": MANIFEST_VERSION, "items": entries}, ensure_ascii=False),
+            encoding="utf-8",
+        )
+        os.replace(tmp, path)
+    except OSError as e:
+        tmp.unlink(missing_ok=True)
+        log.warning("Failed to save manifest", extra={"manifest": str(path), "error": str(e)})
+
+
+def _extract_entry(
+    path: Path,
+    size: int,
+    mtime: float,
+    info: VideoInfo | None = None,
+    probed: bool = False,
+) -> dict:
+    """
+    Everything we know about one file, in manifest (JSON) form.
+    Top-level and picklable so it can run in a worker process. Videos
+    already probed in a batch (`probed`) pass their result as `info`.
+    """
+    video: dict = {}
+    if path.suffix.lower() in IMAGE_EXTS:
+        media_type = "image"
+        duration = None
+        taken_at, location = _extract_image_metadata(path)
+    else:
+        media_type = "video"
+        taken_at, location = None, None
+        if not probed:
+            info = probe_video(path)
+        if info is not None:
+            duration = info.duration
+            video = {
+                "width": info.width,
+                "height": info.height,
+                "rotation": info.rotation,
+                "fps": info.fps,
+                "has_audio": info.has_audio,
+            }
+        else:
+            duration = _get_video_duration(path)
+    # fallback: file modification time if no EXIF date
+    if taken_at is None:
+        taken_at = datetime.fromtimestamp(mtime)
+    return {
+        "type": media_type,
+        "duration": duration,
+        "taken_at": taken_at.isoformat(),
+        "location": location,
+        "size": size,
+        "mtime": mtime,
+        "hash": file_sha256(path),
+        **video,
+    }
+
+
+def _item_from_entry(path: Path, entry: dict) -> MediaItem:
+    return MediaItem(
+        path=path,
+        media_type=entry["type"],
+        duration=entry["duration"],
+        taken_at=datetime.fromisoformat(entry["taken_at"]) if entry.get("taken_at") else None,
+        location=entry.get("location"),
+        size=entry.get("size"),
+        mtime=entry.get("mtime"),
+        content_hash=entry.get("hash"),
+        width=entry.get("width"),
+        height=entry.get("height"),
+        rotation=entry.get("rotation", 0),
+        fps=entry.get("fps"),
+        has_audio=entry.get("has_audio"),
+    )
+
+
+def _get_pool(workers: int) -> ProcessPoolExecutor:
+    """
+    Shared extraction pool, created on first use and kept for the process.
+    Spawned rather than forked: callers (the API, render jobs) are
+    multi-threaded, and forking those can deadlock on inherited locks.
+    """
+    global _POOL, _POOL_SIZE
+    with _POOL_LOCK:
+        if _POOL is None or _POOL_SIZE != workers:
+            if _POOL is not None:
+                _POOL.shutdown(wait=False)
+            _POOL = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+            _POOL_SIZE = workers
+        return _POOL
+
+
+def _extract_entries(
+    jobs: list[tuple[Path, int, float, VideoInfo | None, bool]], workers: int
+) -> list[dict]:
+    """Run _extract_entry over jobs, fanned out to processes when worthwhile."""
+    if workers <= 1 or len(jobs) < max(2, INGEST_POOL_MIN_FILES):
+        return [_extract_entry(*job) for job in jobs]
+    pool = _get_pool(workers)
+    return list(pool.map(_extract_entry, *zip(*jobs)))
+
+
+def load_day_media(
+    root: str | Path,
+    use_manifest: bool = True,
+    workers: int | None = None,
+) -> list[MediaItem]:
     """
     Scan directory and return media items sorted by capture time if available,
     otherwise by file modification time.
+
+    Per-file metadata is kept in <root>/.manifest.json and only recomputed
+    for files whose size or mtime changed, so repeated runs over the same
+    day cost one directory scan plus one manifest read. New or changed files
+    are processed in parallel across `workers` processes (INGEST_WORKERS)
+    once there are at least INGEST_POOL_MIN_FILES of them.
     """
-    media_items: list[MediaItem] = []
-    for p in list_media_files(root):
-        if p.suffix.lower() in {".jpg", ".jpeg", ".png"}:
-            taken_at, location = _extract_image_metadata(p)
-            # fallback: file modification time if no EXIF date
-            if taken_at is None:
-                taken_at = datetime.fromtimestamp(p.stat().st_mtime)
-
-            media_items.append(
-                MediaItem(
-                    path=p,
-                    media_type="image",
-                    duration=None,
-                    taken_at=taken_at,
-                    location=location,
-                )
-            )
+    if workers is None:
+        workers = INGEST_WORKERS
+    root = Path(root)
+    manifest = _load_manifest(root) if use_manifest else {}
+    entries: dict[str, dict] = {}
+    paths: dict[str, Path] = {}
+    stale: list[tuple[str, Path, os.stat_result]] = []
+
+    for p, st in _scan_media(root):
+        rel = p.relative_to(root).as_posix()
+        paths[rel] = p
+        entry = manifest.get(rel)
+        if entry is None or entry.get("size") != st.st_size or entry.get("mtime") != st.st_mtime:
+            stale.append((rel, p, st))
         else:
-            duration = _get_video_duration(p)
-            taken_at = datetime.fromtimestamp(p.stat().st_mtime)
-            media_items.append(
-                MediaItem(
-                    path=p,
-                    media_type="video",
-                    duration=duration,
-                    taken_at=taken_at,
-                    location=None, 
-                )
-            )
-    media_items.sort(key=lambda m: m.taken_at or datetime.fromtimestamp(m.path.stat().st_mtime))
+            entries[rel] = entry
+
+    if stale:
+        # probe new videos up front: header parsing inline, ffprobe for the
+        # rest run concurrently, instead of one subprocess per file in turn
+        videos = [p for _, p, _ in stale if p.suffix.lower() not in IMAGE_EXTS]
+        probed = probe_videos(videos, max_workers=max(1, workers)) if videos else {}
+        fresh = _extract_entries(
+            [(p, st.st_size, st.st_mtime, probed.get(p), p in probed) for _, p, st in stale],
+            workers,
+        )
+        for (rel, _, _), entry in zip(stale, fresh):
+            entries[rel] = entry
+
+    if use_manifest and (stale or len(entries) != len(manifest)):
+        _save_manifest(root, entries)
+
+    media_items = [_item_from_entry(paths[rel], entry) for rel, entry in entries.items()]
+    media_items.sort(key=lambda m: (m.taken_at or datetime.fromtimestamp(m.mtime or 0), m.path.name))
     return media_items
+
+
 def grab_video_frame(path: Path, time_s: float) -> np.ndarray:
     """Grab a BGR frame at `time_s` seconds in the video."""
     cap = cv2.VideoCapture(str(path))
@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+import io
+import logging
+import os
+from pathlib import Path
+
+import cv2
+import numpy as np
+from PIL import Image, ImageOps
+
+from app.media_processing.hashing import file_sha256
+
+log = logging.getLogger(__name__)
+
+# long edge of the image we send to Gemini; plenty for a one-line caption
+CAPTION_MAX_EDGE = int(os.getenv("CAPTION_MAX_EDGE", "1024"))
+CAPTION_JPEG_QUALITY = int(os.getenv("CAPTION_JPEG_QUALITY", "85"))
+PAYLOAD_CACHE_DIR = Path(os.getenv("CAPTION_PAYLOAD_DIR", ".cache/caption_payloads"))
+# payloads only matter until their caption is cached, so this can stay small
+PAYLOAD_CACHE_MAX_BYTES = int(os.getenv("CAPTION_PAYLOAD_CACHE_MAX_MB", "256")) << 20
+
+
+def load_scaled_image(path: str | Path, max_edge: int) -> Image.Image:
+    """
+    Decode an image close to `max_edge` on its long side (JPEG DCT scaling
+    via draft mode), apply EXIF orientation and return an RGB image no
+    larger than max_edge x max_edge.
+    """
+    with Image.open(path) as img:
+        img.draft("RGB", (max_edge, max_edge))
+        img = ImageOps.exif_transpose(img)
+        img = img.convert("RGB")
+    img.thumbnail((max_edge, max_edge), Image.LANCZOS)
+    return img
+
+
+def fit_image_to_canvas(path: str | Path, size: tuple[int, int]) -> Image.Image:
+    """
+    Scale an image to the canvas width and center it on a black canvas
+    (cropping top/bottom if it is taller), decoding JPEGs at reduced scale
+    so peak memory depends on the canvas, not the camera resolution.
+    """
+    w, h = size
+    with Image.open(path) as img:
+        # ask for >= w on both sides: whichever side ends up horizontal
+        # after EXIF rotation is still wide enough
+        img.draft("RGB", (w, w))
+        img = ImageOps.exif_transpose(img)
+        img = img.convert("RGB")
+    scaled_h = max(1, round(img.height * w / img.width))
+    img = img.resize((w, scaled_h), Image.LANCZOS)
+    canvas = Image.new("RGB", size, (0, 0, 0))
+    canvas.paste(img, (0, (h - scaled_h) // 2))
+    return canvas
+
+
+def encode_jpeg(img: Image.Image, quality: int = CAPTION_JPEG_QUALITY) -> bytes:
+    buf = io.BytesIO()
+    img.save(buf, format="JPEG", quality=quality, optimize=True)
+    return buf.getvalue()
+
+
+def image_payload(path: str | Path, content_hash: str | None = None) -> bytes:
+    """
+    Bounded-size JPEG of `path` for captioning, cached on disk by content
+    hash so retries and re-captioning don't decode the original again.
+    """
+    if content_hash is None:
+        content_hash = file_sha256(path)
+    content_hash = content_hash.split(":")[-1]
+
+    cached = PAYLOAD_CACHE_DIR / content_hash[:2] / f"{content_hash}_{CAPTION_MAX_EDGE}.jpg"
+    if cached.exists():
+        os.utime(cached)  # mark as recently used for pruning
+        return cached.read_bytes()
+
+    data = encode_jpeg(load_scaled_image(path, CAPTION_MAX_EDGE))
+    try:
+        cached.parent.mkdir(parents=True, exist_ok=True)
+        tmp = cached.with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_bytes(data)
+        os.replace(tmp, cached)
+    except OSError as e:
+        log.warning("Could not cache caption payload", extra={"src": str(path), "error": str(e)})
+    return data
+
+
+def prune_payload_cache(max_bytes: int = PAYLOAD_CACHE_MAX_BYTES) -> int:
+    """Delete least recently used payloads until the cache fits `max_bytes`."""
+    if not PAYLOAD_CACHE_DIR.exists():
+        return 0
+    files = [(p, p.stat()) for p in PAYLOAD_CACHE_DIR.glob("*/*.jpg")]
+    total = sum(st.st_size for _, st in files)
+    removed = 0
+    for p, st in sorted(files, key=lambda x: x[1].st_mtime):
+        if total <= max_bytes:
+            break
+        p.unlink(missing_ok=True)
+        total -= st.st_size
+        removed += 1
+    return removed
+
+
+def frame_payload(frame: np.ndarray) -> bytes:
+    """Same bounded JPEG encoding for a BGR video frame."""
+    h, w = frame.shape[:2]
+    scale = CAPTION_MAX_EDGE / max(h, w)
+    if scale < 1.0:
+        frame = cv2.resize(
+            frame,
+            (max(1, round(w * scale)), max(1, round(h * scale))),
+            interpolation=cv2.INTER_AREA,
+        )
+    ok, buf = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, CAPTION_JPEG_QUALITY])
+    if not ok:
+        raise RuntimeError("Failed to encode frame as JPG")
+    return buf.tobytes()
@@ -0,0 +1,232 @@
+from __future__ import annotations
+
+import json
+import math
+import shutil
+import struct
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import BinaryIO, Iterator, Optional
+
+# boxes we descend into while looking for track metadata
+_CONTAINERS = {b"moov", b"trak", b"mdia", b"minf", b"stbl", b"edts"}
+# refuse to buffer absurd moov boxes (normal phone clips are a few hundred KB)
+_MAX_MOOV_BYTES = 64 << 20
+
+
+@dataclass
+class VideoInfo:
+    duration: float
+    width: Optional[int] = None
+    height: Optional[int] = None
+    rotation: int = 0
+    fps: Optional[float] = None
+    # None: no probe could tell
+    has_audio: Optional[bool] = None
+
+
+def _iter_boxes(data: bytes, start: int = 0, end: int | None = None) -> Iterator[tuple[bytes, int, int]]:
+    """Yield (type, payload_start, payload_end) for boxes in data[start:end]."""
+    end = len(data) if end is None else end
+    pos = start
+    while pos + 8 <= end:
+        size, kind = struct.unpack(">I4s", data[pos:pos + 8])
+        header = 8
+        if size == 1:
+            if pos + 16 > end:
+                return
+            size = struct.unpack(">Q", data[pos + 8:pos + 16])[0]
+            header = 16
+        elif size == 0:
+            size = end - pos
+        if size < header or pos + size > end:
+            return
+        yield kind, pos + header, pos + size
+        pos += size
+
+
+def _read_moov(f: BinaryIO) -> bytes | None:
+    """Walk the top-level boxes on disk and return the moov payload."""
+    f.seek(0, 2)
+    file_size = f.tell()
+    pos = 0
+    while pos + 8 <= file_size:
+        f.seek(pos)
+        head = f.read(16)
+        if len(head) < 8:
+            return None
+        size, kind = struct.unpack(">I4s", head[:8])
+        header = 8
+        if size == 1:
+            size = struct.unpack(">Q", head[8:16])[0]
+            header = 16
+        elif size == 0:
+            size = file_size - pos
+        if size < header:
+            return None
+        if kind == b"moov":
+            if size - header > _MAX_MOOV_BYTES:
+                return None
+            f.seek(pos + header)
+            return f.read(size - header)
+        pos += size
+    return None
+
+
+def _full_box_version(data: bytes, start: int) -> int:
+    return data[start]
+
+
+def _parse_track(data: bytes, start: int, end: int) -> dict:
+    track: dict = {}
+
+    def walk(s: int, e: int) -> None:
+        for kind, ps, pe in _iter_boxes(data, s, e):
+            if kind in _CONTAINERS:
+                walk(ps, pe)
+            elif kind == b"tkhd":
+                v = _full_box_version(data, ps)
+                p = ps + 4 + (32 if v == 1 else 20)
+                p += 8 + 2 + 2 + 2 + 2  # reserved, layer, alt group, volume, reserved
+                matrix = struct.unpack(">9i", data[p:p + 36])
+                w, h = struct.unpack(">II", data[p + 36:p + 44])
+                track["width"] = w >> 16
+                track["height"] = h >> 16
+                a, b = matrix[0], matrix[1]
+                track["rotation"] = int(round(math.degrees(math.atan2(b, a)))) % 360
+            elif kind == b"mdhd":
+                v = _full_box_version(data, ps)
+                if v == 1:
+                    timescale, duration = struct.unpack(">IQ", data[ps + 20:ps + 32])
+                else:
+                    timescale, duration = struct.unpack(">II", data[ps + 12:ps + 20])
+                track["timescale"] = timescale
+                track["duration"] = duration
+            elif kind == b"hdlr":
+                track["handler"] = data[ps + 8:ps + 12]
+            elif kind == b"stts":
+                (count,) = struct.unpack(">I", data[ps + 4:ps + 8])
+                samples = delta_total = 0
+                for i in range(count):
+                    n, delta = struct.unpack(">II", data[ps + 8 + i * 8:ps + 16 + i * 8])
+                    samples += n
+                    delta_total += n * delta
+                track["samples"] = samples
+                track["sample_ticks"] = delta_total
+
+    walk(start, end)
+    return track
+
+
+def probe_mp4(path: str | Path) -> VideoInfo | None:
+    """
+    Read duration, size, rotation, fps and audio presence straight from the
+    MP4/MOV `moov` box, without spawning ffmpeg or decoding anything.
+    Returns None if the file isn't a parsable ISO-BMFF container.
+    """
+    try:
+        with open(path, "rb") as f:
+            moov = _read_moov(f)
+        if moov is None:
+            return None
+
+        duration = None
+        tracks = []
+        for kind, ps, pe in _iter_boxes(moov):
+            if kind == b"mvhd":
+                v = _full_box_version(moov, ps)
+                if v == 1:
+                    timescale, dur = struct.unpack(">IQ", moov[ps + 20:ps + 32])
+                else:
+                    timescale, dur = struct.unpack(">II", moov[ps + 12:ps + 20])
+                if timescale:
+                    duration = dur / timescale
+            elif kind == b"trak":
+                tracks.append(_parse_track(moov, ps, pe))
+    except (OSError, struct.error, IndexError):
+        return None
+
+    video = next((t for t in tracks if t.get("handler") == b"vide"), None)
+    if duration is None or video is None:
+        return None
+
+    fps = None
+    if video.get("samples") and video.get("sample_ticks") and video.get("timescale"):
+        fps = round(video["samples"] * video["timescale"] / video["sample_ticks"], 3)
+
+    return VideoInfo(
+        duration=float(duration),
+        width=video.get("width") or None,
+        height=video.get("height") or None,
+        rotation=video.get("rotation", 0),
+        fps=fps,
+        has_audio=any(t.get("handler") == b"soun" for t in tracks),
+    )
+
+
+def _parse_rate(rate: str | None) -> float | None:
+    if not rate or rate in {"0/0", "0"}:
+        return None
+    num, _, den = rate.partition("/")
+    try:
+        return round(float(num) / float(den or 1), 3)
+    except (ValueError, ZeroDivisionError):
+        return None
+
+
+def probe_ffprobe(path: str | Path) -> VideoInfo | None:
+    """Fallback for containers we can't parse ourselves (mkv, odd muxers)."""
+    exe = shutil.which("ffprobe")
+    if exe is None:
+        return None
+    try:
+        out = subprocess.run(
+            [exe, "-v", "error", "-print_format", "json",
+             "-show_format", "-show_streams", str(path)],
+            capture_output=True, check=True, timeout=30,
+        ).stdout
+        info = json.loads(out)
+    except (subprocess.SubprocessError, OSError, ValueError):
+        return None
+
+    streams = info.get("streams", [])
+    video = next((s for s in streams if s.get("codec_type") == "video"), None)
+    duration = info.get("format", {}).get("duration") or (video or {}).get("duration")
+    if video is None or duration is None:
+        return None
+
+    # same convention as probe_mp4 and the legacy "rotate" tag: clockwise
+    # degrees (portrait phone clips are 90); the display matrix side data
+    # reports the counter-clockwise angle, so it is negated
+    rotation = int(float(video.get("tags", {}).get("rotate", 0) or 0))
+    for side in video.get("side_data_list", []):
+        if "rotation" in side:
+            rotation = -int(side["rotation"])
+    return VideoInfo(
+        duration=float(duration),
+        width=video.get("width"),
+        height=video.get("height"),
+        rotation=rotation % 360,
+        fps=_parse_rate(video.get("avg_frame_rate")) or _parse_rate(video.get("r_frame_rate")),
+        has_audio=any(s.get("codec_type") == "audio" for s in streams),
+    )
+
+
+def probe_video(path: str | Path) -> VideoInfo | None:
+    return probe_mp4(path) or probe_ffprobe(path)
+
+
+def probe_videos(paths: list[Path], max_workers: int = 4) -> dict[Path, VideoInfo | None]:
+    """
+    Probe many videos: container parsing inline, then the ffprobe fallback
+    for whatever is left, run concurrently (ffprobe takes one input per call).
+    """
+    results: dict[Path, VideoInfo | None] = {p: probe_mp4(p) for p in paths}
+    leftover = [p for p, info in results.items() if info is None]
+    if leftover:
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            for p, info in zip(leftover, pool.map(probe_ffprobe, leftover)):
+                results[p] = info
+    return results
@@ -0,0 +1,184 @@
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+log = logging.getLogger(__name__)
+
+# served through /static, so it has to live under static/
+THUMB_CACHE_DIR = Path(os.getenv("THUMB_CACHE_DIR", "static/thumbs"))
+# long-edge sizes, in pixels
+THUMB_SIZES = tuple(int(s) for s in os.getenv("THUMB_SIZES", "160,320,640").split(","))
+THUMB_FORMAT = os.getenv("THUMB_FORMAT", "webp").lower()
+THUMB_QUALITY = int(os.getenv("THUMB_QUALITY", "80"))
+THUMB_CACHE_MAX_BYTES = int(os.getenv("THUMB_CACHE_MAX_MB", "512")) * 1024 * 1024
+# where in a video the poster frame is taken from
+POSTER_TIME_S = float(os.getenv("POSTER_TIME_S", "1.0"))
+
+IMAGE_EXTS = {".jpg", ".jpeg", ".png"}
+VIDEO_EXTS = {".mp4", ".mov", ".mkv"}
+
+_FORMAT: str | None = None
+
+
+def _format() -> str:
+    """THUMB_FORMAT if this Pillow can write it, else JPEG."""
+    global _FORMAT
+    if _FORMAT is None:
+        _FORMAT = "jpeg"
+        if THUMB_FORMAT == "webp":
+            from PIL import features
+
+            if features.check("webp"):
+                _FORMAT = "webp"
+    return _FORMAT
+
+
+def _source_key(src: Path) -> str:
+    """Identity of the source file as it is now; rewriting it changes the key."""
+    st = src.stat()
+    ident = f"{src.resolve()}|{st.st_size}|{st.st_mtime_ns}"
+    return hashlib.sha1(ident.encode("utf-8")).hexdigest()
+
+
+def thumbnail_paths(src: str | Path) -> dict[str, Path]:
+    """
+    Cache locations of every thumbnail size for `src`, sharded two levels
+    deep by key: static/thumbs/ab/cd/<key>_<size>.webp
+    """
+    key = _source_key(Path(src))
+    folder = THUMB_CACHE_DIR / key[:2] / key[2:4]
+    ext = "jpg" if _format() == "jpeg" else _format()
+    return {str(size): folder / f"{key}_{size}.{ext}" for size in THUMB_SIZES}
+
+
+def existing_thumbnails(src: str | Path) -> dict[str, Path] | None:
+    """Thumbnails already on disk for `src`, or None if they aren't all there."""
+    try:
+        paths = thumbnail_paths(src)
+    except FileNotFoundError:
+        return None
+    if all(p.exists() for p in paths.values()):
+        return paths
+    return None
+
+
+def _poster_frame(src: Path, time_s: float):
+    from PIL import Image
+
+    from app.media_processing.loader import grab_video_frame
+
+    try:
+        frame = grab_video_frame(src, time_s)
+    except RuntimeError:
+        # clip shorter than time_s
+        frame = grab_video_frame(src, 0.0)
+    return Image.fromarray(frame[:, :, ::-1])  # BGR -> RGB
+
+
+def _source_image(src: Path, time_s: float | None):
+    from PIL import Image
+
+    from app.media_processing.preprocess import load_scaled_image
+
+    if src.suffix.lower() in IMAGE_EXTS:
+        return load_scaled_image(src, max(THUMB_SIZES))
+    img = _poster_frame(src, POSTER_TIME_S if time_s is None else time_s)
+    img.thumbnail((max(THUMB_SIZES), max(THUMB_SIZES)), Image.LANCZOS)
+    return img
+
+
+def build_thumbnails(
+    src: str | Path,
+    time_s: float | None = None,
+    force: bool = False,
+) -> dict[str, Path] | None:
+    """
+    Write every thumbnail size for an image, or for a video's poster frame
+    at `time_s` (default POSTER_TIME_S). The source is decoded once at the
+    largest size and scaled down from there. Returns None on failure.
+    """
+    from PIL import Image
+
+    src = Path(src)
+    if not force:
+        existing = existing_thumbnails(src)
+        if existing is not None:
+            return existing
+
+    try:
+        paths = thumbnail_paths(src)
+        img = _source_image(src, time_s)
+        fmt = _format()
+        for size in sorted(THUMB_SIZES, reverse=True):
+            img.thumbnail((size, size), Image.LANCZOS)
+            dst = paths[str(size)]
+            dst.parent.mkdir(parents=True, exist_ok=True)
+            tmp = dst.with_name(f".{dst.name}.{uuid.uuid4().hex}.tmp")
+            img.save(tmp, format=fmt.upper(), quality=THUMB_QUALITY)
+            os.replace(tmp, dst)
+    except Exception as e:
+        log.warning("Failed to build thumbnails", extra={"src": str(src), "error": str(e)})
+        return None
+    return paths
+
+
+def remove_thumbnails(src: str | Path) -> None:
+    """Drop the thumbnails of `src`; call before deleting the source."""
+    try:
+        paths = thumbnail_paths(src)
+    except FileNotFoundError:
+        return
+    for p in paths.values():
+        p.unlink(missing_ok=True)
+
+
+def ensure_day_thumbnails(day_dir: str | Path, max_workers: int = 2) -> int:
+    """Build thumbnails missing for a day's media; returns how many were built."""
+    from app.utils.helpers import list_media_files
+
+    todo = [p for p in list_media_files(day_dir)
+            if not any(part.startswith(".") for part in p.relative_to(day_dir).parts)
+            and existing_thumbnails(p) is None]
+    if not todo:
+        return 0
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        built = sum(1 for r in pool.map(build_thumbnails, todo) if r is not None)
+    log.info("Built thumbnails", extra={"day_dir": str(day_dir), "built": built, "todo": len(todo)})
+    return built
+
+
+def prune_thumbnail_cache(max_bytes: int = THUMB_CACHE_MAX_BYTES) -> int:
+    """
+    Delete the least recently written thumbnail sets until the cache fits
+    `max_bytes`. A source's sizes go together, so a listing never points
+    at a half-deleted set. Returns how many sets were removed.
+    """
+    if not THUMB_CACHE_DIR.exists():
+        return 0
+    # key -> (newest mtime, total bytes, files)
+    sets: dict[str, tuple[float, int, list[Path]]] = {}
+    for p in THUMB_CACHE_DIR.glob("*/*/*"):
+        # in-progress writes are dot-prefixed temp files
+        if p.name.startswith(".") or not p.is_file():
+            continue
+        st = p.stat()
+        key = p.name.split("_", 1)[0]
+        mtime, size, files = sets.get(key, (0.0, 0, []))
+        sets[key] = (max(mtime, st.st_mtime), size + st.st_size, files + [p])
+    total = sum(size for _, size, _ in sets.values())
+    removed = 0
+    for _, size, files in sorted(sets.values(), key=lambda s: s[0]):
+        if total <= max_bytes:
+            break
+        for p in files:
+            p.unlink(missing_ok=True)
+        total -= size
+        removed += 1
+    if removed:
+        log.info("Pruned thumbnail cache", extra={"sets": removed, "bytes": total})
+    return removed
@@ -1,34 +1,57 @@
 from __future__ import annotations
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 from pathlib import Path
 from typing import Iterable
-import cv2
+import json
+import logging
+import math
+import os
+import threading
 import google.generativeai as genai
-from app.media_processing.loader import MediaItem, grab_video_frame
+from app.media_processing.caption_cache import get_caption_cache
+from app.media_processing.hashing import dhash, file_sha256
+from app.media_processing.keyframes import VIDEO_KEYFRAMES, extract_keyframes
+from app.media_processing.loader import MediaItem
+from app.media_processing.preprocess import frame_payload, image_payload, prune_payload_cache
 from app.utils.helpers import get_env
-import json
-from pathlib import Path
+from app.utils.gemini import generate
+from app.utils.metrics import CAPTION_CACHE
+
+log = logging.getLogger(__name__)
 _IMAGE_MODEL = None  # lazy init
-CAPTION_CACHE_PATH = Path("caption_cache.json")
+_IMAGE_MODEL_LOCK = threading.Lock()
+# max number of Gemini caption requests in flight at once
+CAPTION_CONCURRENCY = int(os.getenv("CAPTION_CONCURRENCY", "4"))
+# images whose dHash differs by at most this many bits share a caption
+PHASH_MAX_DISTANCE = int(os.getenv("CAPTION_PHASH_MAX_DISTANCE", "6"))
+# bump when the way video captions are made changes (old ones get redone)
+VIDEO_CAPTION_VERSION = 2
+# photos packed into one multi-image request (1 = one request per photo)
+CAPTION_BATCH_SIZE = int(os.getenv("CAPTION_BATCH_SIZE", "8"))
+# inline image bytes per batched request; Gemini caps a whole request at 20 MB
+CAPTION_BATCH_MAX_BYTES = int(os.getenv("CAPTION_BATCH_MAX_BYTES", str(12 * 1024 * 1024)))
 
-def _load_caption_cache() -> dict:
-    if CAPTION_CACHE_PATH.exists():
-        try:
-            return json.loads(CAPTION_CACHE_PATH.read_text(encoding="utf-8"))
-        except Exception as e:
-            print(f"[CAPTION CACHE] Failed to read cache: {e}")
-            return {}
-    return {}
 
-def _save_caption_cache(cache: dict) -> None:
-    try:
-        CAPTION_CACHE_PATH.write_text(
-            json.dumps(cache, ensure_ascii=False, indent=2),
-            encoding="utf-8",
-        )
-        print(f"[CAPTION CACHE] Saved {len(cache)} entries.")
-    except Exception as e:
-        print(f"[CAPTION CACHE] Failed to save cache: {e}")
+class _AdaptiveBatchSize:
+    """Batch size shared by all caption workers: halved when a batched
+    request fails, grown back one step per success."""
+
+    def __init__(self, maximum: int):
+        self.maximum = max(1, maximum)
+        self.value = self.maximum
+        self._lock = threading.Lock()
+
+    def failed(self) -> None:
+        with self._lock:
+            self.value = max(1, self.value // 2)
+
+    def succeeded(self) -> None:
+        with self._lock:
+            self.value = min(self.maximum, self.value + 1)
+
+
+_BATCH_SIZE = _AdaptiveBatchSize(CAPTION_BATCH_SIZE)
 
 def _get_image_model():
     """
@@ -37,19 +60,13 @@ def _get_image_model():
     Using 'gemini-2.5-flash' from your list_models().
     """
     global _IMAGE_MODEL
-    if _IMAGE_MODEL is None:
-        api_key = get_env("GOOGLE_API_KEY")
-        genai.configure(api_key=api_key)
-        _IMAGE_MODEL = genai.GenerativeModel("gemini-2.5-flash")
+    with _IMAGE_MODEL_LOCK:
+        if _IMAGE_MODEL is None:
+            api_key = get_env("GOOGLE_API_KEY")
+            genai.configure(api_key=api_key)
+            _IMAGE_MODEL = genai.GenerativeModel("gemini-2.5-flash")
     return _IMAGE_MODEL
 
-def _bgr_to_jpeg_bytes(frame) -> bytes:
-    ok, buf = cv2.imencode(".jpg", frame)
-    if not ok:
-        raise RuntimeError("Failed to encode frame as JPG")
-    return buf.tobytes()
-
-
 def _format_time(dt: datetime | None) -> str | None:
     if dt is None:
         return None
@@ -93,69 +110,327 @@ def _wrap_caption_with_context(
     else:
         return base_caption
     
-def describe_image_path(path: Path) -> str:
+def describe_image_path(path: Path, content_hash: str | None = None) -> str:
     model = _get_image_model()
-    img_bytes = path.read_bytes()
+    # downscaled, orientation-corrected JPEG instead of the camera original
+    img_bytes = image_payload(path, content_hash)
     prompt = (
         "Describe this photo in one short, vivid sentence. "
         "Focus on the key subject and mood. No camera jargon."
     )
-    print(f"\n[VISION] Calling {model.model_name} for image:")
-    print(f"        path = {path}")
-    print(f"        prompt = {prompt}")
+    log.debug(
+        "Captioning image",
+        extra={"src": str(path), "model": model.model_name, "payload_bytes": len(img_bytes)},
+    )
 
-    resp = model.generate_content(
-        [prompt, {"mime_type": "image/jpeg", "data": img_bytes}]
+    resp = generate(
+        model,
+        [prompt, {"mime_type": "image/jpeg", "data": img_bytes}],
+        kind="image",
     )
     return (resp.text or "").strip()
 
-def describe_frame(frame) -> str:
+def _parse_batch_captions(text: str, n: int) -> list[str | None]:
+    """
+    Map a JSON answer like [{"index": 1, "caption": "..."}, ...] (or the
+    same list wrapped as {"captions": [...]}) back to the n photos. Numeric
+    string indexes are accepted; anything missing, duplicated or malformed
+    stays None.
+    """
+    captions: list[str | None] = [None] * n
+    try:
+        data = json.loads(text)
+    except ValueError:
+        return captions
+    if isinstance(data, dict):
+        data = data.get("captions")
+    if not isinstance(data, list):
+        return captions
+    for entry in data:
+        if not isinstance(entry, dict):
+            continue
+        idx, caption = entry.get("index"), entry.get("caption")
+        if isinstance(idx, str) and idx.strip().isdigit():
+            idx = int(idx)
+        if (
+            isinstance(idx, int)
+            and not isinstance(idx, bool)
+            and 1 <= idx <= n
+            and isinstance(caption, str)
+            and caption.strip()
+            and captions[idx - 1] is None
+        ):
+            captions[idx - 1] = caption.strip()
+    return captions
+
+
+def describe_images_batch(payloads: list[bytes]) -> list[str | None]:
+    """
+    Caption several downscaled photos (image_payload bytes) in one request
+    with structured JSON output. Returns one caption per photo, None where
+    the answer had no usable entry.
+    """
     model = _get_image_model()
-    img_bytes = _bgr_to_jpeg_bytes(frame)
     prompt = (
-        "Describe this moment from a video in one short sentence. "
-        "Focus on what's happening and the feeling."
+        f"You are given {len(payloads)} photos, each preceded by its number. "
+        "For each photo, describe it in one short, vivid sentence. "
+        "Focus on the key subject and mood. No camera jargon. "
+        'Answer with a JSON array of objects {"index": <photo number>, "caption": <sentence>}, '
+        "one per photo."
+    )
+    contents: list = [prompt]
+    for n, data in enumerate(payloads, 1):
+        contents += [f"Photo {n}:", {"mime_type": "image/jpeg", "data": data}]
+
+    log.debug(
+        "Captioning image batch",
+        extra={
+            "model": model.model_name,
+            "images": len(payloads),
+            "payload_bytes": sum(len(b) for b in payloads),
+        },
+    )
+    resp = generate(
+        model,
+        contents,
+        kind="image_batch",
+        generation_config={"response_mime_type": "application/json"},
     )
+    return _parse_batch_captions(resp.text or "", len(payloads))
+
+
+def _caption_images(group: list[tuple[MediaItem, str | None]]) -> list[str]:
+    """
+    Caption a group of (image, content hash) with as few requests as the
+    adaptive batch size and CAPTION_BATCH_MAX_BYTES allow. Photos the batch
+    answer leaves out, and batches that fail outright, fall back to
+    single-image requests.
+    """
+    payloads = [image_payload(Path(item.path), h) for item, h in group]
+    captions: list[str | None] = [None] * len(group)
+
+    start = 0
+    while start < len(group):
+        # take as many as fit both limits (always at least one)
+        end = start + 1
+        total = len(payloads[start])
+        while (
+            end < len(group)
+            and end - start < _BATCH_SIZE.value
+            and total + len(payloads[end]) <= CAPTION_BATCH_MAX_BYTES
+        ):
+            total += len(payloads[end])
+            end += 1
+
+        if end - start > 1:
+            try:
+                answers = describe_images_batch(payloads[start:end])
+            except Exception as e:
+                _BATCH_SIZE.failed()
+                log.warning(
+                    "Batched caption request failed, shrinking batch",
+                    extra={"images": end - start, "batch_size": _BATCH_SIZE.value, "error": str(e)},
+                )
+                if _BATCH_SIZE.value > 1:
+                    continue  # retry the same photos in smaller batches
+                answers = [None] * (end - start)
+            else:
+                _BATCH_SIZE.succeeded()
+            captions[start:end] = answers
+
+        for i in range(start, end):
+            item, content_hash = group[i]
+            if captions[i] is None:
+                captions[i] = describe_image_path(Path(item.path), content_hash)
+            log.info("Captioned image", extra={"src": str(item.path), "caption": captions[i][:80]})
+        start = end
 
-    print(f"\n[VISION] Calling {model.model_name} for video frame")
-    print(f"        prompt = {prompt}")
+    return captions
 
-    resp = model.generate_content(
-        [prompt, {"mime_type": "image/jpeg", "data": img_bytes}]
+
+def describe_frame(frames) -> str:
+    """
+    Caption a video from one BGR frame, or from a list of frames of the same
+    clip in time order (sent together in a single request).
+    """
+    if not isinstance(frames, (list, tuple)):
+        frames = [frames]
+    model = _get_image_model()
+    payloads = [frame_payload(f) for f in frames]
+    if len(payloads) == 1:
+        prompt = (
+            "Describe this moment from a video in one short sentence. "
+            "Focus on what's happening and the feeling."
+        )
+    else:
+        prompt = (
+            f"These {len(payloads)} frames come from one short video, in order. "
+            "Describe the moment in one short sentence. "
+            "Focus on what's happening and the feeling."
+        )
+
+    log.debug(
+        "Captioning video frames",
+        extra={
+            "model": model.model_name,
+            "frames": len(payloads),
+            "payload_bytes": sum(len(b) for b in payloads),
+        },
+    )
+
+    resp = generate(
+        model,
+        [prompt, *({"mime_type": "image/jpeg", "data": b} for b in payloads)],
+        kind="frame",
     )
     return (resp.text or "").strip()
-def caption_day_media(media):
+
+
+def describe_video(item) -> str:
+    """Caption a clip from VIDEO_KEYFRAMES frames picked in one decoding pass."""
+    keyframes = extract_keyframes(
+        item.path,
+        VIDEO_KEYFRAMES,
+        duration=getattr(item, "duration", None),
+        size=getattr(item, "display_size", None),
+    )
+    return describe_frame([kf.frame for kf in keyframes])
+def _caption_item(item, content_hash: str | None = None) -> str:
+    media_type = getattr(item, "media_type", "")
+    filename = Path(item.path).name
+
+    if media_type == "image":
+        caption = describe_image_path(Path(item.path), content_hash)
+        log.info("Captioned image", extra={"src": str(item.path), "caption": caption[:80]})
+        return caption
+
+    try:
+        caption = describe_video(item)
+    except RuntimeError as e:
+        # unreadable clip (or no ffmpeg): keep the old placeholder
+        log.warning("Could not extract video frames", extra={"src": str(item.path), "error": str(e)})
+        return f"Short video clip from {filename}"
+    log.info("Captioned video", extra={"src": str(item.path), "caption": caption[:80]})
+    return caption
+
+
+def _cache_keys(item) -> tuple[str, int | None]:
+    """Content-hash cache key, plus a perceptual hash for images."""
+    content_hash = getattr(item, "content_hash", None) or file_sha256(item.path)
+    key = "sha256:" + content_hash
+    phash = None
+    if getattr(item, "media_type", "") == "video":
+        # versioned, so placeholder captions from before keyframes get replaced
+        key = f"video-v{VIDEO_CAPTION_VERSION}:{key}"
+    elif getattr(item, "media_type", "") == "image":
+        try:
+            phash = dhash(item.path)
+        except Exception as e:
+            log.warning("Could not hash image", extra={"src": str(item.path), "error": str(e)})
+    return key, phash
+
+
+def caption_day_media(media, max_workers: int | None = None):
     """
-    Returns a list of captions for the given media items.
-    - Images: use Gemini via describe_image_path (with cache)
-    - Videos: use a simple fallback caption (no Gemini)
+    Returns a list of captions for the given media items, in the same order.
+    - Images: use Gemini, up to CAPTION_BATCH_SIZE photos per request
+      (describe_images_batch, with single-photo fallback; cached)
+    - Videos: a few representative frames (see keyframes.py) captioned in
+      one Gemini request
+
+    Captions are cached by file content, so renamed or re-uploaded files
+    hit the cache. Images within CAPTION_PHASH_MAX_DISTANCE bits (dHash) of
+    an already-captioned image, or of another image in this batch, reuse
+    that caption instead of calling Gemini again.
+
+    Uncached items are captioned concurrently (at most `max_workers`
+    requests in flight, rate limited by GEMINI_RPM). Each caption is written
+    to the cache as soon as it arrives, so an interrupted run keeps its work.
     """
-    cache = _load_caption_cache()
-    updated = False
-    captions = []
-    for item in media:
-        key = str(Path(item.path).resolve())
-
-        if key in cache:
-            caption = cache[key]
-            print(f"📝 Using cached caption for {item.path}")
-        else:
-            media_type = getattr(item, "media_type", "")
-            filename = Path(item.path).name
+    if max_workers is None:
+        max_workers = CAPTION_CONCURRENCY
+
+    cache = get_caption_cache()
+    captions: list[str | None] = [None] * len(media)
 
-            if media_type == "image":
-                print(f"🆕 Captioning IMAGE {item.path} with Gemini...")
-                caption = describe_image_path(item.path)
-                print(f"   → {caption[:80]}...")
+    def store(i: int, caption: str) -> None:
+        captions[i] = caption
+        key, phash = keys[i]
+        cache.put(key, caption)
+        if phash is not None:
+            cache.put_phash(key, phash)
+
+    with ThreadPoolExecutor(
+        max_workers=max(1, max_workers),
+        thread_name_prefix="caption",
+    ) as pool:
+        keys = list(pool.map(_cache_keys, media))
+
+        # index of the image that will actually be sent -> its near-duplicates
+        leaders: dict[int, list[int]] = {}
+        for i, item in enumerate(media):
+            key, phash = keys[i]
+            cached = cache.get(key)
+            if cached is not None:
+                # already stored and indexed under this key
+                CAPTION_CACHE.inc(result="hit")
+                captions[i] = cached
+                continue
+            if getattr(item, "media_type", "") == "image":
+                # entries written before content-hash keys existed
+                cached = cache.get(str(Path(item.path).resolve()))
+                if cached is not None:
+                    CAPTION_CACHE.inc(result="hit")
+                    store(i, cached)
+                    continue
+            if phash is not None:
+                cached = cache.find_similar(phash, PHASH_MAX_DISTANCE)
+                if cached is not None:
+                    CAPTION_CACHE.inc(result="near_duplicate")
+                    log.debug("Reusing near-duplicate caption", extra={"src": str(item.path)})
+                    store(i, cached)
+                    continue
+
+            leader = None
+            if phash is not None:
+                for j in leaders:
+                    other = keys[j][1]
+                    if other is not None and bin(phash ^ other).count("1") <= PHASH_MAX_DISTANCE:
+                        leader = j
+                        break
+            if leader is None:
+                CAPTION_CACHE.inc(result="miss")
+                leaders[i] = []
             else:
-                print(f"🎥 Skipping Gemini for VIDEO {item.path}, using simple caption.")
-                caption = f"Short video clip from {filename}"
+                CAPTION_CACHE.inc(result="near_duplicate")
+                leaders[leader].append(i)
 
-            cache[key] = caption
-            updated = True
+        # photos are split evenly over as many workers as there are batches
+        # to fill (each worker then sends batched requests), videos go one
+        # at a time; each future yields captions for its indices
+        images = [i for i in leaders if getattr(media[i], "media_type", "") == "image"]
+        n_groups = min(max(1, max_workers), math.ceil(len(images) / max(1, CAPTION_BATCH_SIZE)))
+        groups = [images[g::n_groups] for g in range(n_groups)] if images else []
+        futures = {
+            pool.submit(_caption_images, [(media[i], keys[i][0]) for i in group]): group
+            for group in groups
+        }
+        futures.update({
+            pool.submit(lambda i=i: [_caption_item(media[i], keys[i][0])]): [i]
+            for i in leaders
+            if getattr(media[i], "media_type", "") != "image"
+        })
+        try:
+            for fut in as_completed(futures):
+                for i, caption in zip(futures[fut], fut.result()):
+                    store(i, caption)
+                    for j in leaders[i]:
+                        log.debug("Reusing near-duplicate caption", extra={"src": str(media[j].path)})
+                        store(j, caption)
+        except BaseException:
+            pool.shutdown(wait=False, cancel_futures=True)
+            raise
 
-        captions.append(caption)
-    if updated:
-        _save_caption_cache(cache)
+    # this day's captions are cached now; its payloads can age out
+    prune_payload_cache()
     return captions
- 
\ No newline at end of file
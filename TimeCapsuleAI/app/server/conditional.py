@@ -0,0 +1,27 @@
+from __future__ import annotations
+
+import hashlib
+
+
+def make_etag(*parts, weak: bool = False) -> str:
+    """Quoted entity tag built from a hash of `parts`."""
+    digest = hashlib.sha1("\0".join(str(p) for p in parts).encode("utf-8")).hexdigest()[:20]
+    return f'W/"{digest}"' if weak else f'"{digest}"'
+
+
+def _opaque(tag: str) -> str:
+    tag = tag.strip()
+    return tag[2:] if tag.startswith("W/") else tag
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """
+    If-None-Match check (weak comparison, as RFC 9110 requires for it).
+    Handles lists of tags and "*".
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    target = _opaque(etag)
+    return any(_opaque(t) == target for t in if_none_match.split(","))
@@ -0,0 +1,222 @@
+from __future__ import annotations
+
+import base64
+import binascii
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable
+
+from app.server.conditional import make_etag
+
+IMAGE_EXTS = {".jpg", ".jpeg", ".png"}
+VIDEO_EXTS = {".mp4", ".mov"}
+
+# how long a listing is trusted before one stat() checks the folder for
+# changes made behind the API's back (explicit invalidation covers the rest)
+REVALIDATE_SECONDS = float(os.getenv("DAY_INDEX_REVALIDATE_SECONDS", "30"))
+
+
+@dataclass
+class Listing:
+    items: list[dict]
+    # sort key of each item, same order as items; used for cursors
+    keys: list[str]
+    etag: str
+    dir_mtime_ns: int | None = None
+    checked_at: float = field(default_factory=time.monotonic)
+
+
+def encode_cursor(key: str) -> str:
+    return base64.urlsafe_b64encode(key.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> str:
+    try:
+        return base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode("utf-8")
+    except (binascii.Error, UnicodeDecodeError):
+        raise ValueError("invalid cursor")
+
+
+def paginate(
+    listing: Listing,
+    cursor: str | None,
+    limit: int | None,
+    descending: bool = False,
+) -> tuple[list[dict], str | None]:
+    """
+    Items after `cursor` (an encoded sort key from a previous page).
+    Keyed rather than offset cursors, so items appended meanwhile don't
+    shift the next page.
+    """
+    start = 0
+    if cursor:
+        after = decode_cursor(cursor)
+        start = len(listing.keys)
+        for i, key in enumerate(listing.keys):
+            if (key < after) if descending else (key > after):
+                start = i
+                break
+    end = len(listing.items) if limit is None else min(start + limit, len(listing.items))
+    next_cursor = encode_cursor(listing.keys[end - 1]) if end < len(listing.items) else None
+    return listing.items[start:end], next_cursor
+
+
+def _dir_mtime_ns(path: Path) -> int | None:
+    try:
+        return path.stat().st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+class DayIndex:
+    """
+    In-memory listings of each day's media and of the rendered wrap-ups.
+
+    Listings are built with one directory scan and then served from memory
+    until invalidated (uploads, deletes, finished renders) or until the
+    folder's mtime changes, which is checked at most every
+    REVALIDATE_SECONDS. Each listing carries an ETag derived from its
+    contents so pollers can be answered with 304.
+    """
+
+    def __init__(
+        self,
+        media_root: Path,
+        static_dir: Path,
+        url_for: Callable[[Path], str],
+        thumbs_for: Callable[[Path], dict | None] | None = None,
+        revalidate_s: float | None = None,
+    ):
+        self.media_root = Path(media_root)
+        self.static_dir = Path(static_dir)
+        self._url_for = url_for
+        self._thumbs_for = thumbs_for or (lambda path: None)
+        self.revalidate_s = REVALIDATE_SECONDS if revalidate_s is None else revalidate_s
+        self._lock = threading.Lock()
+        self._days: dict[str, Listing] = {}
+        self._wrapups: Listing | None = None
+        # bumped on every invalidation; a listing built across one is not kept
+        self._generation = 0
+
+    # ---------- invalidation ----------
+
+    def invalidate_day(self, day: str) -> None:
+        with self._lock:
+            self._generation += 1
+            self._days.pop(day, None)
+
+    def invalidate_all(self) -> None:
+        """Drop every listing, e.g. after thumbnails were pruned from the cache."""
+        with self._lock:
+            self._generation += 1
+            self._days.clear()
+            self._wrapups = None
+
+    def invalidate_wrapups(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._wrapups = None
+
+    def _fresh(self, listing: Listing | None, folder: Path) -> bool:
+        if listing is None:
+            return False
+        now = time.monotonic()
+        if now - listing.checked_at < self.revalidate_s:
+            return True
+        if _dir_mtime_ns(folder) != listing.dir_mtime_ns:
+            return False
+        listing.checked_at = now
+        return True
+
+    # ---------- day media ----------
+
+    def media(self, day: str) -> Listing:
+        folder = self.media_root / day
+        with self._lock:
+            listing = self._days.get(day)
+            if self._fresh(listing, folder):
+                return listing
+            generation = self._generation
+        listing = self._build_media(folder)
+        with self._lock:
+            if generation == self._generation:
+                self._days[day] = listing
+        return listing
+
+    def _build_media(self, folder: Path) -> Listing:
+        mtime_ns = _dir_mtime_ns(folder)
+        entries = []
+        if mtime_ns is not None:
+            with os.scandir(folder) as it:
+                for e in it:
+                    ext = os.path.splitext(e.name)[1].lower()
+                    if ext in IMAGE_EXTS:
+                        kind = "photo"
+                    elif ext in VIDEO_EXTS:
+                        kind = "video"
+                    else:
+                        continue
+                    if not e.is_file():
+                        continue
+                    st = e.stat()
+                    entries.append((st.st_mtime_ns, e.name, kind, st.st_size))
+
+        # capture order; new files land at the end, so cursors stay valid
+        entries.sort()
+        items, keys = [], []
+        for mtime, name, kind, size in entries:
+            path = folder / name
+            items.append({
+                "id": path.as_posix(),
+                "type": kind,
+                "url": self._url_for(path),
+                "thumbnails": self._thumbs_for(path),
+                "size": size,
+                "mtime": mtime / 1e9,
+            })
+            keys.append(f"{mtime:020d}:{name}")
+        return Listing(
+            items=items,
+            keys=keys,
+            # thumbnails appear after upload, so they are part of the tag
+            etag=make_etag(
+                folder.as_posix(), *keys, *(bool(i["thumbnails"]) for i in items), weak=True
+            ),
+            dir_mtime_ns=mtime_ns,
+        )
+
+    # ---------- rendered wrap-ups ----------
+
+    def wrapups(self) -> Listing:
+        with self._lock:
+            if self._fresh(self._wrapups, self.static_dir):
+                return self._wrapups
+            generation = self._generation
+        listing = self._build_wrapups()
+        with self._lock:
+            if generation == self._generation:
+                self._wrapups = listing
+        return listing
+
+    def _build_wrapups(self) -> Listing:
+        mtime_ns = _dir_mtime_ns(self.static_dir)
+        found = {}
+        if mtime_ns is not None:
+            with os.scandir(self.static_dir) as it:
+                for e in it:
+                    stem, ext = os.path.splitext(e.name)
+                    name = stem.split("_")
+                    if ext == ".mp4" and len(name) == 2 and name[0] == "timecapsule":
+                        found[name[1]] = (Path(e.path), e.stat().st_mtime_ns)
+        days = sorted(found, reverse=True)
+        items = [{"date": d, "poster": self._thumbs_for(found[d][0])} for d in days]
+        versions = [f"{d}:{found[d][1]}:{bool(i['poster'])}" for d, i in zip(days, items)]
+        return Listing(
+            items=items,
+            keys=days,
+            etag=make_etag("wrapups", *versions, weak=True),
+            dir_mtime_ns=mtime_ns,
+        )
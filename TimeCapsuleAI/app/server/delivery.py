@@ -0,0 +1,139 @@
+from __future__ import annotations
+
+import mimetypes
+import os
+from email.utils import formatdate
+from pathlib import Path
+
+from fastapi import Request
+from fastapi.responses import Response, StreamingResponse
+
+from app.server.conditional import etag_matches
+
+CHUNK_SIZE = 256 * 1024
+
+# URLs carrying the file's current ?v= token never change content
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+
+mimetypes.add_type("application/vnd.apple.mpegurl", ".m3u8")
+mimetypes.add_type("video/mp2t", ".ts")
+
+
+class RangeNotSatisfiable(ValueError):
+    pass
+
+
+def file_version(st: os.stat_result) -> str:
+    """Changes whenever the file is rewritten (renders replace atomically)."""
+    return f"{st.st_size:x}-{st.st_mtime_ns:x}"
+
+
+def static_url(path: Path, root: Path) -> str:
+    """/static/<path relative to root>?v=<version>; the version makes it cacheable forever."""
+    url = f"/static/{path.relative_to(root).as_posix()}"
+    try:
+        return f"{url}?v={file_version(path.stat())}"
+    except FileNotFoundError:
+        return url
+
+
+def resolve_static(rel_path: str, root: Path, allowed: tuple[Path, ...]) -> Path | None:
+    """Map a /static/ path to a file inside one of the `allowed` folders, else None."""
+    candidate = (root / rel_path).resolve()
+    for base in allowed:
+        if candidate.is_relative_to(base.resolve()) and candidate.is_file():
+            return candidate
+    return None
+
+
+def parse_range(header: str, size: int) -> tuple[int, int] | None:
+    """
+    First range of a `bytes=` Range header as inclusive (start, end).
+    None means "ignore it and send the whole file" (other units, syntax we
+    don't handle); RangeNotSatisfiable means 416.
+    """
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or not spec:
+        return None
+    first = spec.split(",")[0].strip()
+    start_s, sep, end_s = first.partition("-")
+    if not sep:
+        return None
+    try:
+        if start_s == "":
+            # suffix range: last N bytes
+            length = int(end_s)
+        else:
+            start = int(start_s)
+            end = int(end_s) if end_s else size - 1
+    except ValueError:
+        return None
+    if start_s == "":
+        if length <= 0 or size == 0:
+            raise RangeNotSatisfiable(header)
+        return max(0, size - length), size - 1
+    if start >= size or end < start:
+        raise RangeNotSatisfiable(header)
+    return start, min(end, size - 1)
+
+
+def _iter_file(path: Path, start: int, length: int):
+    with open(path, "rb") as f:
+        f.seek(start)
+        remaining = length
+        while remaining > 0:
+            chunk = f.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+def serve_file(request: Request, path: Path, version: str | None = None) -> Response:
+    """
+    Serve `path` with strong ETag / Last-Modified validators, If-None-Match
+    304s and single-range Range requests (206 / 416, honouring If-Range).
+    Requests whose `version` matches the file get immutable cache headers.
+    """
+    st = path.stat()
+    current = file_version(st)
+    etag = f'"{current}"'
+    last_modified = formatdate(st.st_mtime, usegmt=True)
+    media_type = mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+    headers = {
+        "ETag": etag,
+        "Last-Modified": last_modified,
+        "Accept-Ranges": "bytes",
+        "Cache-Control": IMMUTABLE if version == current else REVALIDATE,
+    }
+
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+
+    size = st.st_size
+    start, end = 0, size - 1
+    status = 200
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if range_header and (not if_range or if_range.strip() in (etag, last_modified)):
+        try:
+            byte_range = parse_range(range_header, size)
+        except RangeNotSatisfiable:
+            headers["Content-Range"] = f"bytes */{size}"
+            return Response(status_code=416, headers=headers)
+        if byte_range is not None:
+            start, end = byte_range
+            status = 206
+            headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+
+    length = max(0, end - start + 1)
+    headers["Content-Length"] = str(length)
+    if request.method == "HEAD":
+        return Response(status_code=status, headers=headers, media_type=media_type)
+    return StreamingResponse(
+        _iter_file(path, start, length),
+        status_code=status,
+        headers=headers,
+        media_type=media_type,
+    )
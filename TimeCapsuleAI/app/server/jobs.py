@@ -0,0 +1,235 @@
+from __future__ import annotations
+
+import json
+import logging
+import os
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, fields
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Literal, Optional
+
+from app.utils.metrics import JOBS as JOBS_METRIC
+
+log = logging.getLogger(__name__)
+
+JobStatus = Literal["queued", "running", "done", "failed"]
+
+ACTIVE_STATUSES = ("queued", "running")
+# how many finished jobs we keep around for /jobs/{id} lookups
+MAX_FINISHED_JOBS = 200
+
+
+@dataclass
+class Job:
+    id: str
+    day: str
+    status: JobStatus = "queued"
+    stage: Optional[str] = None
+    progress: float = 0.0
+    created_at: Optional[str] = None
+    started_at: Optional[str] = None
+    finished_at: Optional[str] = None
+    output_path: Optional[str] = None
+    error: Optional[str] = None
+    force: bool = False
+    # submission order; created_at only has one-second resolution
+    seq: int = 0
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Job":
+        known = {f.name for f in fields(cls)}
+        return cls(**{k: v for k, v in data.items() if k in known})
+
+
+ProgressCallback = Callable[[str, float], None]
+JobRunner = Callable[[Job, ProgressCallback], str]
+
+
+def _now() -> str:
+    return datetime.now().isoformat(timespec="seconds")
+
+
+class JobQueue:
+    """
+    Bounded worker pool for wrap-up renders.
+
+    Jobs are persisted to a small JSON file on every state change, so jobs
+    that were queued (or interrupted mid-render) when the API stopped are
+    picked up again by `restore()` on the next start.
+    """
+
+    def __init__(
+        self,
+        runner: JobRunner,
+        store_path: str | Path = "jobs.json",
+        max_workers: int | None = None,
+    ):
+        if max_workers is None:
+            max_workers = int(os.getenv("WRAPUP_WORKERS", "2"))
+        self._runner = runner
+        self._store_path = Path(store_path)
+        self._executor = ThreadPoolExecutor(
+            max_workers=max(1, max_workers),
+            thread_name_prefix="wrapup-job",
+        )
+        self._lock = threading.RLock()
+        self._jobs: dict[str, Job] = {}
+        self._seq = 0
+        # day -> ids of jobs waiting for that day's current job to end, in
+        # order; a day's jobs run one at a time
+        self._followups: dict[str, list[str]] = {}
+
+    # ---------- persistence ----------
+
+    def _load(self) -> dict[str, Job]:
+        if not self._store_path.exists():
+            return {}
+        try:
+            raw = json.loads(self._store_path.read_text(encoding="utf-8"))
+        except Exception as e:
+            log.warning("Failed to read job store", extra={"error": str(e)})
+            return {}
+        return {d["id"]: Job.from_dict(d) for d in raw.get("jobs", [])}
+
+    def _save(self) -> None:
+        with self._lock:
+            finished = [j for j in self._jobs.values() if j.status not in ACTIVE_STATUSES]
+            if len(finished) > MAX_FINISHED_JOBS:
+                finished.sort(key=lambda j: j.finished_at or "")
+                for j in finished[: len(finished) - MAX_FINISHED_JOBS]:
+                    del self._jobs[j.id]
+            payload = {"jobs": [j.to_dict() for j in self._jobs.values()]}
+            tmp = self._store_path.with_suffix(self._store_path.suffix + ".tmp")
+            try:
+                tmp.write_text(json.dumps(payload, ensure_ascii=False), encoding="utf-8")
+                os.replace(tmp, self._store_path)
+            except Exception as e:
+                log.warning("Failed to save job store", extra={"error": str(e)})
+
+    def restore(self) -> int:
+        """Reload the store and re-enqueue jobs that never finished."""
+        with self._lock:
+            self._jobs.update(self._load())
+            self._seq = max([self._seq, *(j.seq for j in self._jobs.values())])
+            pending = [j for j in self._jobs.values() if j.status in ACTIVE_STATUSES]
+            pending.sort(key=lambda j: (j.seq, j.created_at or ""))
+            first: dict[str, Job] = {}
+            for job in pending:
+                job.status = "queued"
+                job.stage = None
+                job.progress = 0.0
+                job.started_at = None
+                # an interrupted render and its follow-up still run in turn
+                if job.day in first:
+                    self._followups.setdefault(job.day, []).append(job.id)
+                else:
+                    first[job.day] = job
+            self._save()
+        for job in first.values():
+            self._executor.submit(self._run, job.id)
+        if pending:
+            log.info("Restored pending jobs", extra={"count": len(pending)})
+        return len(pending)
+
+    # ---------- public API ----------
+
+    def submit(self, day: str, force: bool = False) -> Job:
+        """
+        Queue a wrap-up for `day`. If one is already queued or running for
+        that day, the existing job is returned instead of a duplicate.
+
+        A forced request is never swallowed by a non-forced one: a queued
+        job is upgraded to force in place, and a running one gets a forced
+        follow-up job that starts when it finishes.
+        """
+        with self._lock:
+            waiting = self._followups.get(day)
+            active = self._jobs[waiting[-1]] if waiting else self.latest_for_day(day)
+            if active is not None and active.status in ACTIVE_STATUSES:
+                if not force or active.force:
+                    return active
+                if active.status == "queued":
+                    active.force = True
+                    self._save()
+                    return active
+            self._seq += 1
+            job = Job(id=uuid.uuid4().hex, day=day, created_at=_now(), force=force, seq=self._seq)
+            self._jobs[job.id] = job
+            if active is not None and active.status == "running":
+                self._followups.setdefault(day, []).append(job.id)
+                self._save()
+                return job
+            self._save()
+        self._executor.submit(self._run, job.id)
+        return job
+
+    def get(self, job_id: str) -> Job | None:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def latest_for_day(self, day: str) -> Job | None:
+        with self._lock:
+            jobs = [j for j in self._jobs.values() if j.day == day]
+        if not jobs:
+            return None
+        return max(jobs, key=lambda j: (j.seq, j.created_at or ""))
+
+    def shutdown(self, wait: bool = False) -> None:
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+
+    # ---------- worker ----------
+
+    def _update(self, job_id: str, **changes) -> None:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return
+            for k, v in changes.items():
+                setattr(job, k, v)
+            self._save()
+
+    def _run(self, job_id: str) -> None:
+        job = self.get(job_id)
+        if job is None or job.status != "queued":
+            return
+
+        self._update(job_id, status="running", started_at=_now(), stage="starting")
+
+        def progress(stage: str, fraction: float) -> None:
+            self._update(job_id, stage=stage, progress=round(min(max(fraction, 0.0), 1.0), 3))
+
+        try:
+            result = self._runner(job, progress)
+        except Exception as e:
+            log.exception("Wrap-up job failed", extra={"job_id": job_id, "day": job.day})
+            JOBS_METRIC.inc(status="failed")
+            self._update(
+                job_id,
+                status="failed",
+                error=str(e),
+                finished_at=_now(),
+            )
+        else:
+            JOBS_METRIC.inc(status="done" if result else "no_media")
+            self._update(
+                job_id,
+                status="done",
+                stage="done" if result else "no_media",
+                progress=1.0,
+                output_path=result or None,
+                finished_at=_now(),
+            )
+
+        with self._lock:
+            waiting = self._followups.get(job.day)
+            followup = waiting.pop(0) if waiting else None
+            if not waiting:
+                self._followups.pop(job.day, None)
+        if followup is not None:
+            self._executor.submit(self._run, followup)
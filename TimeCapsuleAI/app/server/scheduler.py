@@ -0,0 +1,138 @@
+from __future__ import annotations
+
+import logging
+import os
+import threading
+from datetime import date, datetime, time, timedelta
+from typing import Callable, Iterable
+
+log = logging.getLogger(__name__)
+
+# local time at which the nightly wrap-ups are queued
+SCHEDULE_TIME = os.getenv("WRAPUP_SCHEDULE_TIME", "23:30")
+SCHEDULER_ENABLED = os.getenv("WRAPUP_SCHEDULER", "1") not in ("0", "false", "no")
+# gap between two days' submissions within one nightly run
+STAGGER_SECONDS = float(os.getenv("WRAPUP_STAGGER_SECONDS", "120"))
+# earlier days that are also checked, so a night the server was down is caught up
+CATCHUP_DAYS = int(os.getenv("WRAPUP_CATCHUP_DAYS", "1"))
+
+
+def parse_schedule_time(value: str) -> time:
+    hour, _, minute = value.strip().partition(":")
+    return time(int(hour), int(minute or 0))
+
+
+class WrapupScheduler:
+    """
+    Background thread that queues wrap-ups once a day at `at`.
+
+    Each run looks at today plus the previous `catchup_days` days, skips
+    days whose video is already newer than their newest media
+    (`is_stale(day)` is False) and submits the rest `stagger_s` seconds
+    apart, so one run doesn't start every render at the same moment.
+    """
+
+    def __init__(
+        self,
+        submit: Callable[[str], object],
+        is_stale: Callable[[str], bool],
+        media_days: Callable[[], Iterable[str]],
+        at: str | None = None,
+        stagger_s: float | None = None,
+        catchup_days: int | None = None,
+        enabled: bool | None = None,
+    ):
+        self._submit = submit
+        self._is_stale = is_stale
+        self._media_days = media_days
+        self.at = parse_schedule_time(at or SCHEDULE_TIME)
+        self.stagger_s = STAGGER_SECONDS if stagger_s is None else stagger_s
+        self.catchup_days = CATCHUP_DAYS if catchup_days is None else catchup_days
+        self.enabled = SCHEDULER_ENABLED if enabled is None else enabled
+
+        self.last_run: datetime | None = None
+        self.last_submitted: list[str] = []
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    # ---------- schedule maths ----------
+
+    @property
+    def scheduled_time(self) -> str:
+        return self.at.strftime("%H:%M")
+
+    def next_run(self, now: datetime | None = None) -> datetime:
+        now = now or datetime.now()
+        run = datetime.combine(now.date(), self.at)
+        return run if now < run else run + timedelta(days=1)
+
+    def after_schedule(self, day: str, now: datetime | None = None) -> bool:
+        """Has the scheduled run for `day` already come around?"""
+        now = now or datetime.now()
+        return now >= datetime.combine(date.fromisoformat(day), self.at)
+
+    def status(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "running": self._thread is not None and self._thread.is_alive(),
+            "scheduled_time": self.scheduled_time,
+            "next_run": self.next_run().isoformat(timespec="seconds") if self.enabled else None,
+            "last_run": self.last_run.isoformat(timespec="seconds") if self.last_run else None,
+            "last_submitted": list(self.last_submitted),
+        }
+
+    # ---------- running ----------
+
+    def due_days(self, today: date | None = None) -> list[str]:
+        """Days in the catch-up window that have media and a stale (or no) wrap-up."""
+        today = today or date.today()
+        oldest = (today - timedelta(days=self.catchup_days)).isoformat()
+        window = [d for d in self._media_days() if oldest <= d <= today.isoformat()]
+        # today first: it's the one the app is waiting for
+        return [d for d in sorted(window, reverse=True) if self._is_stale(d)]
+
+    def run_once(self) -> list[str]:
+        self.last_run = datetime.now()
+        days = self.due_days(self.last_run.date())
+        submitted = []
+        for i, day in enumerate(days):
+            if i and self._stop.wait(self.stagger_s):
+                break
+            self._submit(day)
+            submitted.append(day)
+            log.info("Scheduled wrap-up queued", extra={"day": day})
+        self.last_submitted = submitted
+        if not days:
+            log.info("Scheduled run: nothing to do")
+        return submitted
+
+    def _loop(self) -> None:
+        # started after today's slot (restart, late deploy): run now instead of
+        # waiting a whole day; stale checks make this a no-op if already done
+        if self.after_schedule(date.today().isoformat()):
+            self._safe_run()
+        while True:
+            wait = (self.next_run() - datetime.now()).total_seconds()
+            if self._stop.wait(max(wait, 0.0)):
+                return
+            self._safe_run()
+
+    def _safe_run(self) -> None:
+        try:
+            self.run_once()
+        except Exception:
+            log.exception("Scheduled wrap-up run failed")
+
+    def start(self) -> None:
+        if not self.enabled or self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="wrapup-scheduler", daemon=True)
+        self._thread.start()
+        log.info("Wrap-up scheduler started", extra={"at": self.scheduled_time})
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
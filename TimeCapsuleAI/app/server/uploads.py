@@ -0,0 +1,230 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import AsyncIterator
+
+from fastapi import UploadFile
+from fastapi.concurrency import run_in_threadpool
+
+log = logging.getLogger(__name__)
+
+# bytes read from the client per write; keeps upload memory flat
+UPLOAD_CHUNK_SIZE = 1 << 20
+UPLOAD_SESSION_DIR = Path(".uploads")
+# sessions with no new bytes for this long are abandoned and deleted
+UPLOAD_SESSION_MAX_AGE_S = float(os.getenv("UPLOAD_SESSION_MAX_AGE_HOURS", "48")) * 3600
+# how often init() looks for abandoned sessions
+_PRUNE_EVERY_S = 600
+
+
+class UploadNotFound(KeyError):
+    pass
+
+
+class UploadOffsetMismatch(ValueError):
+    """Client sent a chunk for the wrong offset; `expected` is where to resume."""
+
+    def __init__(self, expected: int):
+        super().__init__(f"expected offset {expected}")
+        self.expected = expected
+
+
+def _hash_file(path: Path) -> "hashlib._Hash":
+    h = hashlib.sha256()
+    with path.open("rb") as f:
+        for chunk in iter(lambda: f.read(UPLOAD_CHUNK_SIZE), b""):
+            h.update(chunk)
+    return h
+
+
+def _write_chunk(f, h: "hashlib._Hash", chunk: bytes) -> None:
+    h.update(chunk)
+    f.write(chunk)
+
+
+async def save_upload_file(file: UploadFile, dest: Path) -> tuple[int, str]:
+    """
+    Stream an UploadFile to `dest` in fixed-size chunks through a temp file
+    in the same folder, then atomically rename it into place.
+    Returns (size_in_bytes, sha256_hex), hashed on the fly.
+    """
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    tmp = dest.with_name(f".{dest.name}.{uuid.uuid4().hex}.part")
+    h = hashlib.sha256()
+    size = 0
+    try:
+        with tmp.open("wb") as f:
+            while True:
+                chunk = await file.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                # disk writes happen off the event loop
+                await run_in_threadpool(_write_chunk, f, h, chunk)
+                size += len(chunk)
+        os.replace(tmp, dest)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+    return size, h.hexdigest()
+
+
+class ResumableUploads:
+    """
+    init -> append chunk at offset (repeat) -> finalize.
+
+    Session data lives in `root` as <id>.part (bytes received so far) and
+    <id>.json (metadata), so an interrupted upload can continue from
+    `status(id)["offset"]`, even across API restarts. The SHA-256 is
+    updated as chunks arrive; after a restart it is rebuilt once from the
+    partial file. Sessions idle for longer than `max_age_s` are deleted at
+    startup and, every few minutes, when a new upload starts.
+    """
+
+    def __init__(
+        self,
+        root: str | Path = UPLOAD_SESSION_DIR,
+        max_age_s: float = UPLOAD_SESSION_MAX_AGE_S,
+    ):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.max_age_s = max_age_s
+        self._hashers: dict[str, tuple[int, "hashlib._Hash"]] = {}
+        self._locks: dict[str, asyncio.Lock] = {}
+        self._pruned_at = 0.0
+        self.prune_stale()
+
+    def _part(self, upload_id: str) -> Path:
+        return self.root / f"{upload_id}.part"
+
+    def _meta_path(self, upload_id: str) -> Path:
+        return self.root / f"{upload_id}.json"
+
+    def _meta(self, upload_id: str) -> dict:
+        if not upload_id.isalnum():
+            raise UploadNotFound(upload_id)
+        p = self._meta_path(upload_id)
+        if not p.exists():
+            raise UploadNotFound(upload_id)
+        return json.loads(p.read_text(encoding="utf-8"))
+
+    def _lock(self, upload_id: str) -> asyncio.Lock:
+        return self._locks.setdefault(upload_id, asyncio.Lock())
+
+    def prune_stale(self) -> int:
+        """Delete sessions (and stray halves of one) idle for over max_age_s."""
+        self._pruned_at = time.monotonic()
+        if not self.max_age_s:
+            return 0
+        cutoff = time.time() - self.max_age_s
+        last_active: dict[str, float] = {}
+        for p in self.root.iterdir():
+            if p.suffix not in (".part", ".json"):
+                continue
+            try:
+                mtime = p.stat().st_mtime
+            except FileNotFoundError:
+                continue
+            last_active[p.stem] = max(last_active.get(p.stem, 0.0), mtime)
+        removed = 0
+        for upload_id, mtime in last_active.items():
+            lock = self._locks.get(upload_id)
+            if mtime >= cutoff or (lock is not None and lock.locked()):
+                continue
+            self._part(upload_id).unlink(missing_ok=True)
+            self._meta_path(upload_id).unlink(missing_ok=True)
+            self._hashers.pop(upload_id, None)
+            self._locks.pop(upload_id, None)
+            removed += 1
+        if removed:
+            log.info("Removed abandoned uploads", extra={"count": removed})
+        return removed
+
+    def init(
+        self,
+        filename: str | None,
+        content_type: str | None = None,
+        total_size: int | None = None,
+    ) -> dict:
+        if time.monotonic() - self._pruned_at > _PRUNE_EVERY_S:
+            self.prune_stale()
+        upload_id = uuid.uuid4().hex
+        meta = {
+            "id": upload_id,
+            "filename": filename,
+            "content_type": content_type,
+            "total_size": total_size,
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+        }
+        self._part(upload_id).touch()
+        self._meta_path(upload_id).write_text(json.dumps(meta), encoding="utf-8")
+        self._hashers[upload_id] = (0, hashlib.sha256())
+        return self.status(upload_id)
+
+    def status(self, upload_id: str) -> dict:
+        meta = self._meta(upload_id)
+        return {
+            **meta,
+            "upload_id": upload_id,
+            "offset": self._part(upload_id).stat().st_size,
+            "chunk_size": UPLOAD_CHUNK_SIZE,
+        }
+
+    def _hasher_at(self, upload_id: str, offset: int) -> "hashlib._Hash":
+        known = self._hashers.get(upload_id)
+        if known is None or known[0] != offset:
+            known = (offset, _hash_file(self._part(upload_id)))
+        return known[1]
+
+    async def append(
+        self,
+        upload_id: str,
+        offset: int,
+        chunks: AsyncIterator[bytes],
+    ) -> int:
+        """Append a streamed chunk at `offset`; returns the new offset."""
+        async with self._lock(upload_id):
+            meta = self._meta(upload_id)
+            part = self._part(upload_id)
+            current = part.stat().st_size
+            if offset != current:
+                raise UploadOffsetMismatch(current)
+
+            # may re-hash the partial file after a restart
+            h = await run_in_threadpool(self._hasher_at, upload_id, current)
+            total_size = meta.get("total_size")
+            with part.open("ab") as f:
+                async for chunk in chunks:
+                    if not chunk:
+                        continue
+                    if total_size is not None and current + len(chunk) > total_size:
+                        raise ValueError("chunk exceeds declared total_size")
+                    await run_in_threadpool(_write_chunk, f, h, chunk)
+                    current += len(chunk)
+            self._hashers[upload_id] = (current, h)
+            return current
+
+    async def finalize(self, upload_id: str, dest: Path) -> tuple[int, str]:
+        """Move the completed upload to `dest`; returns (size, sha256_hex)."""
+        async with self._lock(upload_id):
+            meta = self._meta(upload_id)
+            part = self._part(upload_id)
+            size = part.stat().st_size
+            total_size = meta.get("total_size")
+            if total_size is not None and size != total_size:
+                raise UploadOffsetMismatch(size)
+
+            digest = (await run_in_threadpool(self._hasher_at, upload_id, size)).hexdigest()
+            dest.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(part, dest)
+            self._meta_path(upload_id).unlink(missing_ok=True)
+            self._hashers.pop(upload_id, None)
+        self._locks.pop(upload_id, None)
+        return size, digest
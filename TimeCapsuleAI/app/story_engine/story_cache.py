@@ -0,0 +1,43 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+
+from app.utils.sqlite_cache import SqliteCache
+
+STORY_CACHE_DB = Path(os.getenv("STORY_CACHE_DB", "story_cache.sqlite3"))
+
+_CACHE: SqliteCache | None = None
+_CACHE_LOCK = threading.Lock()
+
+
+def story_key(captions: list[str], prompt_version: int, model_name: str) -> str:
+    """Hash of everything the poem depends on: the ordered captions, prompt and model."""
+    payload = json.dumps(
+        {"captions": list(captions), "prompt": prompt_version, "model": model_name},
+        ensure_ascii=False,
+    )
+    return "story:" + hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def get_story_cache() -> SqliteCache:
+    """
+    Shared cache of generated poems (JSON values).
+    STORY_CACHE_MAX_ENTRIES / STORY_CACHE_MAX_AGE_DAYS bound its size
+    (0 disables the limit).
+    """
+    global _CACHE
+    with _CACHE_LOCK:
+        if _CACHE is None:
+            max_entries = int(os.getenv("STORY_CACHE_MAX_ENTRIES", "2000"))
+            max_age_days = float(os.getenv("STORY_CACHE_MAX_AGE_DAYS", "365"))
+            _CACHE = SqliteCache(
+                STORY_CACHE_DB,
+                table="stories",
+                max_entries=max_entries,
+                max_age_s=max_age_days * 86400,
+            )
+        return _CACHE
@@ -1,16 +1,46 @@
 from __future__ import annotations
 
+import json
+import logging
+
 from app.media_processing.object_tags import extract_keywords_from_captions
-from app.story_engine.wrapup_llm import generate_poem_from_captions
+from app.story_engine.story_cache import get_story_cache, story_key
+from app.story_engine.wrapup_llm import (
+    POEM_PROMPT_VERSION,
+    TEXT_MODEL_NAME,
+    generate_poem_from_captions,
+)
+from app.utils.metrics import STORY_CACHE
+
+log = logging.getLogger(__name__)
 
 
-def build_day_story(captions: list[str]) -> dict:
+def build_day_story(captions: list[str], force_new_poem: bool = False) -> dict:
     """
     Basic story object; extend later with title, sections, etc.
+
+    The poem is memoized on the ordered captions, the prompt version and
+    the model, so regenerating an unchanged day costs no Gemini call.
+    `force_new_poem` skips the lookup and replaces the cached poem. The
+    title is cheap and derived from the captions, so it isn't cached.
     """
-    poem = generate_poem_from_captions(captions)
     keywords = extract_keywords_from_captions(captions)
     title = "A Day of " + (", ".join(word.capitalize() for word in keywords[:3]) or "Moments")
+    cache = get_story_cache()
+    key = story_key(captions, POEM_PROMPT_VERSION, TEXT_MODEL_NAME)
+
+    if not force_new_poem:
+        cached = cache.get(key)
+        if cached is not None:
+            STORY_CACHE.inc(result="hit")
+            return {"title": title, "poem": json.loads(cached)["poem"], "keywords": keywords}
+    STORY_CACHE.inc(result="forced" if force_new_poem else "miss")
+
+    poem = generate_poem_from_captions(captions)
+    # an empty poem means generation failed; try again next time
+    if poem and poem.strip():
+        cache.put(key, json.dumps({"poem": poem}, ensure_ascii=False))
+    log.info("Generated story", extra={"title": title, "forced": force_new_poem})
     return {
         "title": title,
         "poem": poem,
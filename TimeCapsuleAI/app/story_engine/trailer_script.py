@@ -10,6 +10,8 @@ class Shot:
     path: Path | None
     duration: float
     text: str | None = None
+    # probed metadata of the source file, so renderers don't reopen it
+    source: MediaItem | None = None
 @dataclass
 class TrailerScript:
     shots: list[Shot]
@@ -48,6 +50,7 @@ def build_trailer_script(
                     kind="image",
                     path=m.path,
                     duration=image_duration,
+                    source=m,
                 )
             )
     # 3. Videos
@@ -59,6 +62,7 @@ def build_trailer_script(
                     kind="video_clip",
                     path=m.path,
                     duration=dur,
+                    source=m,
                 )
             )
     # 4. Poem card
@@ -1,12 +1,19 @@
 from __future__ import annotations
 
+import logging
 from textwrap import dedent
 
 import google.generativeai as genai
 
+from app.utils.gemini import generate
 from app.utils.helpers import get_env
 
+log = logging.getLogger(__name__)
+
 _TEXT_MODEL = None
+TEXT_MODEL_NAME = "gemini-2.5-flash"
+# bump whenever the poem prompt below changes; part of the story cache key
+POEM_PROMPT_VERSION = 1
 
 
 def _get_text_model():
@@ -20,7 +27,7 @@ def _get_text_model():
         api_key = get_env("GOOGLE_API_KEY")
         genai.configure(api_key=api_key)
         # 👇 also from your list_models() output
-        _TEXT_MODEL = genai.GenerativeModel("gemini-2.5-flash")
+        _TEXT_MODEL = genai.GenerativeModel(TEXT_MODEL_NAME)
     return _TEXT_MODEL
 
 
@@ -47,10 +54,10 @@ def generate_poem_from_captions(captions: list[str]) -> str:
         """
     ).strip()
 
-    # 👇 DEBUG LOG
-    print("\n[POEM] Calling", model.model_name)
-    print("[POEM] Prompt being sent to Gemini:\n")
-    print(prompt)
-    print("\n[POEM] --------------------\n")
-    resp = model.generate_content(prompt)
+    log.info(
+        "Generating poem",
+        extra={"model": model.model_name, "captions": len(limited), "prompt_chars": len(prompt)},
+    )
+    log.debug("Poem prompt", extra={"prompt": prompt})
+    resp = generate(model, prompt, kind="poem")
     return (resp.text or "").strip()
@@ -0,0 +1,41 @@
+from __future__ import annotations
+
+import logging
+import time
+
+from app.utils.metrics import GEMINI_REQUESTS, GEMINI_SECONDS, GEMINI_UPLOAD_BYTES
+from app.utils.rate_limit import gemini_limiter
+
+log = logging.getLogger(__name__)
+
+
+def generate(model, contents, kind: str, **kwargs):
+    """
+    model.generate_content() behind the shared rate limiter, with latency,
+    outcome and uploaded-bytes metrics labelled by `kind` (image, frame, poem...).
+    """
+    parts = contents if isinstance(contents, list) else [contents]
+    payload = sum(len(p["data"]) for p in parts if isinstance(p, dict) and "data" in p)
+
+    gemini_limiter().acquire()
+    start = time.perf_counter()
+    try:
+        resp = model.generate_content(contents, **kwargs)
+    except Exception:
+        GEMINI_REQUESTS.inc(kind=kind, status="error")
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        GEMINI_SECONDS.observe(elapsed, kind=kind)
+    GEMINI_REQUESTS.inc(kind=kind, status="ok")
+    GEMINI_UPLOAD_BYTES.inc(payload, kind=kind)
+    log.debug(
+        "Gemini call",
+        extra={
+            "kind": kind,
+            "model": getattr(model, "model_name", None),
+            "duration_s": round(elapsed, 3),
+            "payload_bytes": payload,
+        },
+    )
+    return resp
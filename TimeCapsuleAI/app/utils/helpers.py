@@ -111,6 +111,7 @@
 from __future__ import annotations
 
 import os
+import shutil
 from pathlib import Path
 
 from dotenv import load_dotenv
@@ -141,10 +142,24 @@ def ensure_dir(path: str | Path) -> Path:
     return p
 
 
+MEDIA_EXTS = {".jpg", ".jpeg", ".png", ".mp4", ".mov", ".mkv"}
+
+
 def list_media_files(root: str | Path) -> list[Path]:
     """Return all image/video files under root, sorted by modification time."""
     root = Path(root)
-    exts = {".jpg", ".jpeg", ".png", ".mp4", ".mov", ".mkv"}
-    files = [p for p in root.glob("**/*") if p.is_file() and p.suffix.lower() in exts]
+    files = [p for p in root.glob("**/*") if p.is_file() and p.suffix.lower() in MEDIA_EXTS]
     files.sort(key=lambda p: p.stat().st_mtime)
     return files
+
+
+def ffmpeg_exe() -> str:
+    """ffmpeg on PATH, else the binary bundled with imageio-ffmpeg (via moviepy)."""
+    exe = shutil.which("ffmpeg")
+    if exe:
+        return exe
+    try:
+        import imageio_ffmpeg
+    except ImportError:
+        raise RuntimeError("ffmpeg not found (install it or imageio-ffmpeg)")
+    return imageio_ffmpeg.get_ffmpeg_exe()
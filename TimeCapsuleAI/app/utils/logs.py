@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+import json
+import logging
+import os
+
+# attributes every LogRecord has; anything else came in via `extra=`
+_RESERVED = set(logging.LogRecord("", 0, "", 0, "", (), None).__dict__) | {
+    "message",
+    "asctime",
+}
+
+_CONFIGURED = False
+
+
+def _fields(record: logging.LogRecord) -> dict:
+    return {k: v for k, v in record.__dict__.items() if k not in _RESERVED}
+
+
+def _kv(value) -> str:
+    s = str(value)
+    if not s or any(c in s for c in ' ="'):
+        return json.dumps(s, ensure_ascii=False)
+    return s
+
+
+class KeyValueFormatter(logging.Formatter):
+    """ts=... level=INFO logger=app.x msg="..." key=value ..."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        parts = [
+            f"ts={self.formatTime(record, '%Y-%m-%dT%H:%M:%S')}",
+            f"level={record.levelname}",
+            f"logger={record.name}",
+            f"msg={_kv(record.getMessage())}",
+        ]
+        parts += [f"{k}={_kv(v)}" for k, v in _fields(record).items()]
+        line = " ".join(parts)
+        if record.exc_info:
+            line += "\n" + self.formatException(record.exc_info)
+        return line
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            "ts": self.formatTime(record, "%Y-%m-%dT%H:%M:%S"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+            **_fields(record),
+        }
+        if record.exc_info:
+            data["exc"] = self.formatException(record.exc_info)
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+def configure_logging(level: str | None = None, fmt: str | None = None) -> None:
+    """
+    Set up leveled, structured logging once per process.
+    LOG_LEVEL (default INFO) and LOG_FORMAT ("kv" or "json") override defaults.
+    """
+    global _CONFIGURED
+    if _CONFIGURED:
+        return
+    level = (level or os.getenv("LOG_LEVEL", "INFO")).upper()
+    fmt = (fmt or os.getenv("LOG_FORMAT", "kv")).lower()
+
+    handler = logging.StreamHandler()
+    handler.setFormatter(JsonFormatter() if fmt == "json" else KeyValueFormatter())
+    root = logging.getLogger("app")
+    root.handlers[:] = [handler]
+    root.setLevel(level)
+    root.propagate = False
+    _CONFIGURED = True
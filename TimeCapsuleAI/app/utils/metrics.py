@@ -0,0 +1,205 @@
+from __future__ import annotations
+
+import bisect
+import logging
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator
+
+LabelKey = tuple[tuple[str, str], ...]
+
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+
+def _label_key(labels: dict) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_labels(key: LabelKey, extra: tuple[tuple[str, str], ...] = ()) -> str:
+    pairs = key + extra
+    if not pairs:
+        return ""
+    escaped = (
+        (k, v.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"'))
+        for k, v in pairs
+    )
+    return "{" + ",".join(f'{k}="{v}"' for k, v in escaped) + "}"
+
+
+def _format_value(v: float) -> str:
+    if math.isinf(v):
+        return "+Inf" if v > 0 else "-Inf"
+    return repr(float(v)) if not float(v).is_integer() else str(int(v))
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str):
+        self.name = name
+        self.help = help
+        self._lock = threading.Lock()
+
+    def _samples(self) -> list[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        lines += self._samples()
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str):
+        super().__init__(name, help)
+        self._values: dict[LabelKey, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(_label_key(labels), 0.0)
+
+    def _samples(self) -> list[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(k)} {_format_value(v)}" for k, v in items]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float, **labels) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, help)
+        self.buckets = tuple(sorted(buckets))
+        # per label set: [bucket counts..., +Inf count], sum
+        self._values: dict[LabelKey, tuple[list[int], float]] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = _label_key(labels)
+        idx = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total = self._values.get(key, ([0] * (len(self.buckets) + 1), 0.0))
+            counts[idx] += 1
+            self._values[key] = (counts, total + value)
+
+    def _samples(self) -> list[str]:
+        with self._lock:
+            items = sorted((k, (list(c), s)) for k, (c, s) in self._values.items())
+        lines = []
+        for key, (counts, total) in items:
+            running = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                running += count
+                le = (("le", _format_value(bound)),)
+                lines.append(f"{self.name}_bucket{_format_labels(key, le)} {running}")
+            lines.append(f"{self.name}_sum{_format_labels(key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(key)} {running}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name: str, help: str, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = cls(name, help, **kwargs)
+                self._metrics[name] = metric
+            return metric
+
+    def counter(self, name: str, help: str) -> Counter:
+        return self._get_or_create(Counter, name, help)
+
+    def gauge(self, name: str, help: str) -> Gauge:
+        return self._get_or_create(Gauge, name, help)
+
+    def histogram(self, name: str, help: str, buckets: tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        return self._get_or_create(Histogram, name, help, buckets=buckets)
+
+    def render_prometheus(self) -> str:
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda m: m.name)
+        return "\n".join(m.render() for m in metrics) + "\n"
+
+
+REGISTRY = Registry()
+
+# ---------- pipeline metrics ----------
+
+STAGE_SECONDS = REGISTRY.histogram(
+    "timecaps_stage_duration_seconds", "Wall time of each wrap-up pipeline stage."
+)
+GEMINI_SECONDS = REGISTRY.histogram(
+    "timecaps_gemini_request_duration_seconds", "Latency of Gemini calls by kind."
+)
+GEMINI_REQUESTS = REGISTRY.counter(
+    "timecaps_gemini_requests_total", "Gemini calls by kind and outcome."
+)
+GEMINI_UPLOAD_BYTES = REGISTRY.counter(
+    "timecaps_gemini_upload_bytes_total", "Image bytes sent to Gemini."
+)
+CAPTION_CACHE = REGISTRY.counter(
+    "timecaps_caption_cache_total", "Caption cache lookups by result (hit, near_duplicate, miss)."
+)
+STORY_CACHE = REGISTRY.counter(
+    "timecaps_story_cache_total", "Poem/title cache lookups by result (hit, miss, forced)."
+)
+RENDER_FPS = REGISTRY.histogram(
+    "timecaps_render_fps",
+    "Output frames rendered per second of wall time.",
+    buckets=(1, 2, 5, 10, 20, 30, 50, 100, 200, 500),
+)
+ENCODE_SECONDS = REGISTRY.histogram(
+    "timecaps_encode_duration_seconds", "Time spent encoding video, by mode."
+)
+SEGMENTS = REGISTRY.counter(
+    "timecaps_render_segments_total", "Rendered shot segments by result (encoded, reused)."
+)
+JOBS = REGISTRY.counter(
+    "timecaps_wrapup_jobs_total", "Wrap-up jobs finished, by status."
+)
+
+_log = logging.getLogger("app.metrics")
+
+
+@contextmanager
+def span(name: str, histogram: Histogram = STAGE_SECONDS, **fields) -> Iterator[dict]:
+    """
+    Time a block, record it in `histogram` (labelled stage=name) and log it.
+    The yielded dict can be filled with extra fields for the log line.
+    """
+    extra: dict = dict(fields)
+    start = time.perf_counter()
+    status = "ok"
+    try:
+        yield extra
+    except BaseException:
+        status = "error"
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        histogram.observe(elapsed, stage=name)
+        _log.info(
+            "span finished",
+            extra={"span": name, "duration_s": round(elapsed, 3), "status": status, **extra},
+        )
@@ -0,0 +1,57 @@
+from __future__ import annotations
+
+import os
+import threading
+import time
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket.
+
+    `rate` tokens are added per second up to `capacity`; `acquire()` blocks
+    until a token is available. Used to keep concurrent Gemini calls under
+    the account's requests-per-minute quota.
+    """
+
+    def __init__(self, rate: float, capacity: float | None = None):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(1.0, rate))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, tokens: float = 1.0) -> None:
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                wait = (tokens - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+_GEMINI_LIMITER: TokenBucket | None = None
+_GEMINI_LIMITER_LOCK = threading.Lock()
+
+
+def gemini_limiter() -> TokenBucket:
+    """
+    Process-wide limiter shared by every Gemini call.
+    GEMINI_RPM sets the quota (requests per minute), GEMINI_BURST the bucket size.
+    """
+    global _GEMINI_LIMITER
+    with _GEMINI_LIMITER_LOCK:
+        if _GEMINI_LIMITER is None:
+            rpm = float(os.getenv("GEMINI_RPM", "60"))
+            burst = float(os.getenv("GEMINI_BURST", "5"))
+            _GEMINI_LIMITER = TokenBucket(rate=rpm / 60.0, capacity=burst)
+        return _GEMINI_LIMITER
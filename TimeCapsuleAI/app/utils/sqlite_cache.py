@@ -0,0 +1,163 @@
+from __future__ import annotations
+
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+
+class SqliteCache:
+    """
+    Small key/value cache on top of SQLite in WAL mode.
+
+    - O(1)-ish primary-key lookups and upserts (no full-file rewrites)
+    - safe for concurrent writers across threads and processes
+    - bounded: entries older than `max_age_s` or beyond `max_entries`
+      (least recently used first) are evicted
+
+    One connection is opened per thread; SQLite handles the locking.
+    """
+
+    # evict every N writes rather than on every put
+    EVICT_EVERY = 256
+
+    def __init__(
+        self,
+        path: str | Path,
+        table: str = "entries",
+        max_entries: int | None = None,
+        max_age_s: float | None = None,
+    ):
+        if not table.isidentifier():
+            raise ValueError(f"Invalid table name: {table!r}")
+        self.path = Path(path)
+        self.table = table
+        self.max_entries = max_entries or None
+        self.max_age_s = max_age_s or None
+        self._local = threading.local()
+        self._writes = 0
+        self._writes_lock = threading.Lock()
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._conn() as conn:
+            conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {self.table} ("
+                " key TEXT PRIMARY KEY,"
+                " value TEXT NOT NULL,"
+                " created_at REAL NOT NULL,"
+                " accessed_at REAL NOT NULL)"
+            )
+            conn.execute(
+                f"CREATE INDEX IF NOT EXISTS {self.table}_accessed"
+                f" ON {self.table}(accessed_at)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache_meta (key TEXT PRIMARY KEY, value TEXT)"
+            )
+            self._create_schema(conn)
+        self.evict()
+
+    def _create_schema(self, conn: sqlite3.Connection) -> None:
+        """Hook for subclasses that need extra tables."""
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.path), timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    # ---------- key/value ----------
+
+    def get(self, key: str) -> str | None:
+        conn = self._conn()
+        row = conn.execute(
+            f"SELECT value FROM {self.table} WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        with conn:
+            conn.execute(
+                f"UPDATE {self.table} SET accessed_at = ? WHERE key = ?",
+                (time.time(), key),
+            )
+        return row[0]
+
+    def put(self, key: str, value: str) -> None:
+        now = time.time()
+        with self._conn() as conn:
+            conn.execute(
+                f"INSERT INTO {self.table} (key, value, created_at, accessed_at)"
+                " VALUES (?, ?, ?, ?)"
+                " ON CONFLICT(key) DO UPDATE SET"
+                " value = excluded.value, accessed_at = excluded.accessed_at",
+                (key, value, now, now),
+            )
+        self._maybe_evict()
+
+    def put_many(self, items: dict[str, str]) -> None:
+        now = time.time()
+        with self._conn() as conn:
+            conn.executemany(
+                f"INSERT INTO {self.table} (key, value, created_at, accessed_at)"
+                " VALUES (?, ?, ?, ?)"
+                " ON CONFLICT(key) DO UPDATE SET"
+                " value = excluded.value, accessed_at = excluded.accessed_at",
+                [(k, v, now, now) for k, v in items.items()],
+            )
+        self._maybe_evict()
+
+    def __contains__(self, key: str) -> bool:
+        row = self._conn().execute(
+            f"SELECT 1 FROM {self.table} WHERE key = ?", (key,)
+        ).fetchone()
+        return row is not None
+
+    def __len__(self) -> int:
+        return self._conn().execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+
+    # ---------- meta flags (e.g. one-time migrations) ----------
+
+    def get_meta(self, key: str) -> str | None:
+        row = self._conn().execute(
+            "SELECT value FROM cache_meta WHERE key = ?", (key,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def set_meta(self, key: str, value: str) -> None:
+        with self._conn() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO cache_meta (key, value) VALUES (?, ?)",
+                (key, value),
+            )
+
+    # ---------- eviction ----------
+
+    def _maybe_evict(self) -> None:
+        with self._writes_lock:
+            self._writes += 1
+            due = self._writes % self.EVICT_EVERY == 0
+        if due:
+            self.evict()
+
+    def evict(self) -> int:
+        """Drop expired entries, then trim to `max_entries` by least recent use."""
+        removed = 0
+        with self._conn() as conn:
+            if self.max_age_s:
+                cur = conn.execute(
+                    f"DELETE FROM {self.table} WHERE accessed_at < ?",
+                    (time.time() - self.max_age_s,),
+                )
+                removed += cur.rowcount
+            if self.max_entries:
+                cur = conn.execute(
+                    f"DELETE FROM {self.table} WHERE key IN ("
+                    f" SELECT key FROM {self.table}"
+                    " ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,),
+                )
+                removed += cur.rowcount
+        return removed
@@ -1,9 +1,16 @@
 from __future__ import annotations
 
+import logging
+import math
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
 import numpy as np
 from moviepy.editor import (
+    CompositeVideoClip,
     ImageClip,
     VideoFileClip,
     concatenate_videoclips,
@@ -12,100 +19,31 @@ from moviepy.editor import (
 
 
 
-from PIL import Image, ImageDraw, ImageFont
-
+from app.media_processing.preprocess import fit_image_to_canvas
 from app.story_engine.trailer_script import Shot, TrailerScript
+from app.utils.metrics import ENCODE_SECONDS, SEGMENTS
+from app.video_composer.proxies import fresh_proxy
+from app.video_composer.segments import (
+    cached_segment,
+    concat_segments,
+    prune_segment_cache,
+    segment_key,
+    segment_path,
+    write_segment,
+)
+from app.video_composer.settings import (
+    AUDIO_CODEC,
+    BITRATE,
+    FASTSTART_PARAMS,
+    FFMPEG_PARAMS,
+    FPS,
+    PRESET,
+    VIDEO_CODEC,
+    VIDEO_SIZE,
+)
+from app.video_composer.text_cards import CARD_DURATION, card_frame
 
-
-VIDEO_SIZE = (1080, 1920)  # (width, height) for vertical video
-FPS = 24
-
-
-# ---------- Text rendering helpers (no ImageMagick needed) ----------
-
-def _load_font(font_size: int) -> ImageFont.FreeTypeFont | ImageFont.ImageFont:
-    """
-    Try to load a TTF font; fall back to default bitmap font if not found.
-    """
-    # Try common Windows font first
-    for font_name in ["arial.ttf", "ARIAL.TTF"]:
-        try:
-            return ImageFont.truetype(font_name, font_size)
-        except OSError:
-            continue
-
-    # Fallback: default PIL font
-    return ImageFont.load_default()
-
-
-
-def _make_text_image(
-    text: str,
-    size: tuple[int, int] = VIDEO_SIZE,
-    font_size: int = 60,
-    margin: int = 80,
-    gradient: tuple[tuple[int, int, int], tuple[int, int, int]] | None = None,
-) -> Image.Image:
-    """
-    Create an image with a vertical gradient background and centered multiline text.
-    gradient: ((r1,g1,b1), (r2,g2,b2)) or None for solid black.
-    """
-    w, h = size
-
-    # --- background: gradient or solid black ---
-    if gradient is None:
-        img = Image.new("RGB", size, (0, 0, 0))
-    else:
-        (r1, g1, b1), (r2, g2, b2) = gradient
-        img = Image.new("RGB", size)
-        draw_bg = ImageDraw.Draw(img)
-        for y in range(h):
-            t = y / max(h - 1, 1)
-            r = int(r1 + (r2 - r1) * t)
-            g = int(g1 + (g2 - g1) * t)
-            b = int(b1 + (b2 - b1) * t)
-            draw_bg.line([(0, y), (w, y)], fill=(r, g, b))
-
-    draw = ImageDraw.Draw(img)
-    font = _load_font(font_size)
-
-    words = text.split()
-    lines: list[str] = []
-    if not words:
-        return img
-
-    # ---------- word wrapping ----------
-    current = words[0]
-    for word in words[1:]:
-        test_line = current + " " + word
-        left, top, right, bottom = draw.textbbox((0, 0), test_line, font=font)
-        line_width = right - left
-        if line_width > w - 2 * margin:
-            lines.append(current)
-            current = word
-        else:
-            current = test_line
-    lines.append(current)
-
-    # ---------- total text height ----------
-    line_heights = []
-    for line in lines:
-        left, top, right, bottom = draw.textbbox((0, 0), line, font=font)
-        line_heights.append(bottom - top)
-
-    total_text_height = sum(line_heights) + (len(lines) - 1) * 10
-    y = (h - total_text_height) // 2
-
-    # ---------- draw each line centered ----------
-    for i, line in enumerate(lines):
-        left, top, right, bottom = draw.textbbox((0, 0), line, font=font)
-        line_width = right - left
-        line_height = bottom - top
-        x = (w - line_width) // 2
-        draw.text((x, y), line, font=font, fill=(255, 255, 255))
-        y += line_height + 10
-
-    return img
+log = logging.getLogger(__name__)
 
 
 # ---------- Clip constructors ----------
@@ -152,27 +90,32 @@ def _video_shot(shot: Shot):
 #     return base.crossfadein(0.2)
 
 def _image_shot(shot: Shot):
-    base = (
-        ImageClip(str(shot.path))
-        # scale by width so we fill horizontally
-        .resize(width=VIDEO_SIZE[0])           # 1080 wide, keep aspect ratio
-        # pad to full 1080x1920 canvas
-        .on_color(
-            size=VIDEO_SIZE,
-            color=(0, 0, 0),
-            pos="center",
-        )
-        .set_duration(shot.duration)
-    )
-    return base.crossfadein(0.2)
+    proxy = fresh_proxy(shot.path)
+    if proxy is not None:
+        # already fitted to the 1080x1920 canvas at ingest time
+        return ImageClip(str(proxy)).set_duration(shot.duration).fx(vfx.fadein, 0.2)
+
+    # decode near target size (JPEG draft mode), EXIF-rotate, fit width and
+    # pad to 1080x1920 before MoviePy sees it
+    frame = np.asarray(fit_image_to_canvas(shot.path, VIDEO_SIZE))
+    return ImageClip(frame).set_duration(shot.duration).fx(vfx.fadein, 0.2)
 
 def _video_shot(shot: Shot):
-    clip = (
-        VideoFileClip(str(shot.path))
-        .subclip(0, shot.duration)
-        .resize(height=VIDEO_SIZE[1])
-    )
-    return clip.crossfadein(0.2)
+    # skip setting up an audio reader only when a probe said there's no track
+    has_audio = not (shot.source is not None and shot.source.has_audio is False)
+    proxy = fresh_proxy(shot.path)
+    if proxy is not None:
+        # normalized 1080x1920 / 24 fps at ingest time: no per-frame resize
+        clip = VideoFileClip(str(proxy), audio=has_audio).subclip(0, shot.duration)
+        return clip.fx(vfx.fadein, 0.2)
+
+    # no proxy (not built yet, or the build failed): same geometry as the
+    # proxy and the ffmpeg backend, i.e. fit inside 1080x1920 and pad
+    clip = VideoFileClip(str(shot.path), audio=has_audio).subclip(0, shot.duration)
+    w, h = clip.size
+    scale = min(VIDEO_SIZE[0] / w, VIDEO_SIZE[1] / h)
+    clip = clip.resize(scale).on_color(size=VIDEO_SIZE, color=(0, 0, 0), pos="center")
+    return clip.fx(vfx.fadein, 0.2)
 
 
 # def _poem_card(shot: Shot):
@@ -183,35 +126,147 @@ def _video_shot(shot: Shot):
 #     return clip.crossfadein(0.5)
 
 def _poem_card(shot: Shot):
-    text = shot.text or ""
-    # e.g. warm orange -> dark purple
-    img = _make_text_image(
-        text,
+    # memoized: identical cards across a batch are drawn once
+    frame = card_frame(shot.text or "")
+    clip = ImageClip(frame).set_duration(CARD_DURATION)
+    # fade from black (same look as crossfadein over the black background,
+    # but without a mask, so full-frame clips can be chained)
+    return clip.fx(vfx.fadein, 0.5)
+
+
+# ---------- Main render function ----------
+
+# render shot-by-shot through the segment cache (RENDER_SEGMENT_CACHE=0 to disable)
+USE_SEGMENT_CACHE = os.getenv("RENDER_SEGMENT_CACHE", "1") != "0"
+# "moviepy" (default) or "ffmpeg" (single filter_complex subprocess)
+RENDER_BACKEND = os.getenv("RENDER_BACKEND", "moviepy")
+# processes encoding segments in parallel (1 = serial); by default the CPUs
+# are shared between the WRAPUP_WORKERS renders that can run at once
+_CONCURRENT_RENDERS = max(1, int(os.getenv("WRAPUP_WORKERS", "2")))
+RENDER_WORKERS = int(os.getenv(
+    "RENDER_WORKERS",
+    str(max(1, (os.cpu_count() or 2) // _CONCURRENT_RENDERS - 1)),
+))
+
+
+def _shot_clip(shot: Shot):
+    if shot.kind == "image":
+        return _image_shot(shot)
+    if shot.kind == "video_clip":
+        return _video_shot(shot)
+    # title_card / poem_card
+    return _poem_card(shot)
+
+
+def _full_frame(clip):
+    """Center a clip on the black 1080x1920 canvas (what compose-mode concat does)."""
+    if tuple(clip.size) == VIDEO_SIZE and clip.mask is None:
+        return clip
+    return CompositeVideoClip(
+        [clip.set_position("center")],
         size=VIDEO_SIZE,
-        font_size=48,
-        gradient=((160, 80, 0), (40, 0, 70)),
+        bg_color=(0, 0, 0),
+    ).set_duration(clip.duration)
+
+
+def _encode_segment(shot: Shot, key: str) -> Path:
+    """Build and encode one shot; top-level so it can run in a worker process."""
+    clip = _full_frame(_shot_clip(shot))
+    try:
+        return write_segment(clip, segment_path(key))
+    finally:
+        clip.close()
+
+
+def _render_segmented(script: TrailerScript, output_path: Path, workers: int = 1) -> None:
+    """
+    Encode each shot as its own cached segment and stitch them with a
+    stream-copy concat. Only shots whose key (parameters, source content,
+    encoder settings) is new get encoded, so a regenerate after adding a
+    photo costs roughly one segment.
+
+    Missing segments are encoded in parallel across `workers` processes,
+    in contiguous groups of shots. Every segment fades in from black on its
+    own, so joining them needs no cross-segment blending.
+    """
+    keys = [segment_key(shot) for shot in script.shots]
+    segments: list[Path | None] = [cached_segment(k) for k in keys]
+    missing = [i for i, seg in enumerate(segments) if seg is None]
+
+    started = time.perf_counter()
+    if missing and workers > 1 and len(missing) > 1:
+        n = min(workers, len(missing))
+        # spawn: renders run on the API's job threads, and forking a
+        # threaded process can deadlock the children on inherited locks
+        with ProcessPoolExecutor(
+            max_workers=n, mp_context=multiprocessing.get_context("spawn")
+        ) as pool:
+            results = pool.map(
+                _encode_segment,
+                [script.shots[i] for i in missing],
+                [keys[i] for i in missing],
+                chunksize=max(1, math.ceil(len(missing) / (n * 2))),
+            )
+            for i, seg in zip(missing, results):
+                segments[i] = seg
+    else:
+        for i in missing:
+            segments[i] = _encode_segment(script.shots[i], keys[i])
+
+    if missing:
+        ENCODE_SECONDS.observe(time.perf_counter() - started, mode="segments")
+    SEGMENTS.inc(len(missing), result="encoded")
+    SEGMENTS.inc(len(segments) - len(missing), result="reused")
+    log.info(
+        "Segments ready",
+        extra={"encoded": len(missing), "reused": len(segments) - len(missing)},
     )
-    frame = np.array(img)
-    clip = ImageClip(frame).set_duration(5)
-    return clip.crossfadein(0.5)
 
+    started = time.perf_counter()
+    concat_segments(segments, output_path)
+    ENCODE_SECONDS.observe(time.perf_counter() - started, mode="concat")
+    prune_segment_cache()
 
-# ---------- Main render function ----------
 
-def render_trailer(script: TrailerScript, output_path: str | Path) -> None:
-    clips = []
+def render_trailer(
+    script: TrailerScript,
+    output_path: str | Path,
+    segment_cache: bool | None = None,
+    workers: int | None = None,
+    backend: str | None = None,
+) -> None:
+    output_path = Path(output_path)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+
+    backend = backend or RENDER_BACKEND
+    if backend == "ffmpeg":
+        from app.video_composer.ffmpeg_backend import render_trailer_ffmpeg
+
+        started = time.perf_counter()
+        render_trailer_ffmpeg(script, output_path)
+        ENCODE_SECONDS.observe(time.perf_counter() - started, mode="ffmpeg")
+        return
+    if backend != "moviepy":
+        raise ValueError(f"Unknown render backend: {backend!r}")
+
+    if segment_cache is None:
+        segment_cache = USE_SEGMENT_CACHE
+    if segment_cache:
+        _render_segmented(
+            script,
+            output_path,
+            workers=RENDER_WORKERS if workers is None else workers,
+        )
+        return
 
-    for shot in script.shots:
-        if shot.kind == "title_card":
-            clips.append(_poem_card(shot))
-        elif shot.kind == "image":
-            clips.append(_image_shot(shot))
-        elif shot.kind == "video_clip":
-            clips.append(_video_shot(shot))
-        elif shot.kind == "poem_card":
-            clips.append(_poem_card(shot))
+    clips = [_shot_clip(shot) for shot in script.shots]
 
-    final = concatenate_videoclips(clips, method="compose")
+    # when every clip is already a full 1080x1920 frame (text cards and
+    # ingest-time proxies) a plain chain is enough; otherwise composite
+    if all(tuple(c.size) == VIDEO_SIZE and c.mask is None for c in clips):
+        final = concatenate_videoclips(clips, method="chain")
+    else:
+        final = concatenate_videoclips(clips, method="compose")
 
     # final = final.resize(VIDEO_SIZE)
 
@@ -220,22 +275,17 @@ def render_trailer(script: TrailerScript, output_path: str | Path) -> None:
     even_w = w - (w % 2)
     even_h = h - (h % 2)
     if even_w != w or even_h != h:
-      print(f"[VIDEO] Adjusting size from {w}x{h} to {even_w}x{even_h} for compatibility.")
+      log.info("Adjusting output size to even dimensions", extra={"size": f"{w}x{h}", "even_size": f"{even_w}x{even_h}"})
       final = final.resize((even_w, even_h))
 
-    output_path = Path(output_path)
-    output_path.parent.mkdir(parents=True, exist_ok=True)
-
+    started = time.perf_counter()
     final.write_videofile(
         str(output_path),
-        fps=24,                 # lower fps -> fewer frames to encode
-        codec="libx264",
-        audio_codec="aac",
-        preset="superfast",     # faster encoding (bigger file but fine for dev)
-        bitrate="2000k",   
-        ffmpeg_params=[
-        "-profile:v", "baseline",  # simpler profile
-        "-level", "3.0",           # low-ish level
-        "-pix_fmt", "yuv420p",     # widely supported pixel format
-    ],
+        fps=FPS,                # lower fps -> fewer frames to encode
+        codec=VIDEO_CODEC,
+        audio_codec=AUDIO_CODEC,
+        preset=PRESET,
+        bitrate=BITRATE,
+        ffmpeg_params=FFMPEG_PARAMS + FASTSTART_PARAMS,
     )
+    ENCODE_SECONDS.observe(time.perf_counter() - started, mode="full")
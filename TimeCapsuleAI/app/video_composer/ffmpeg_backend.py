@@ -0,0 +1,136 @@
+from __future__ import annotations
+
+import os
+import subprocess
+import tempfile
+from pathlib import Path
+
+from app.media_processing.probe import probe_video
+from app.story_engine.trailer_script import Shot, TrailerScript
+from app.utils.helpers import ffmpeg_exe
+from app.video_composer.proxies import build_proxy, fresh_proxy
+from app.video_composer.settings import (
+    AUDIO_CODEC,
+    AUDIO_RATE,
+    BITRATE,
+    FASTSTART_PARAMS,
+    FFMPEG_PARAMS,
+    FPS,
+    PRESET,
+    VIDEO_CODEC,
+    VIDEO_SIZE,
+)
+from app.video_composer.text_cards import CARD_DURATION, card_image
+
+# fade-in lengths, matching the MoviePy shot constructors
+IMAGE_FADE = 0.2
+VIDEO_FADE = 0.2
+CARD_FADE = 0.5
+
+
+def _shot_duration(shot: Shot) -> float:
+    if shot.kind in ("title_card", "poem_card"):
+        return float(CARD_DURATION)
+    return float(shot.duration)
+
+
+def _has_audio(shot: Shot, src: Path) -> bool:
+    if shot.source is not None and shot.source.media_type == "video" and shot.source.has_audio is not None:
+        return shot.source.has_audio
+    info = probe_video(src)
+    return bool(info and info.has_audio)
+
+
+def build_ffmpeg_command(
+    script: TrailerScript,
+    output_path: Path,
+    workdir: Path,
+) -> list[str]:
+    """
+    Compile a TrailerScript into one ffmpeg invocation:
+    every shot is an input, normalized to 1080x1920 / 24 fps / yuv420p
+    (scale + pad), faded in from black, paired with a stereo audio track
+    (silence for stills) and joined with the concat filter.
+
+    Stills (images, and text cards pre-drawn to PNG) are looped inputs.
+    """
+    w, h = VIDEO_SIZE
+    inputs: list[str] = []
+    filters: list[str] = []
+    labels: list[str] = []
+
+    for i, shot in enumerate(script.shots):
+        dur = _shot_duration(shot)
+        normalize = (
+            f"scale={w}:{h}:force_original_aspect_ratio=decrease,"
+            f"pad={w}:{h}:-1:-1:black,fps={FPS},format=yuv420p,setsar=1,"
+            f"trim=duration={dur:.3f},setpts=PTS-STARTPTS"
+        )
+
+        audio_src: str | None = None
+        if shot.kind in ("title_card", "poem_card"):
+            card = workdir / f"card_{i}.png"
+            card_image(shot.text or "").save(card)
+            inputs += ["-loop", "1", "-framerate", str(FPS), "-t", f"{dur:.3f}", "-i", str(card)]
+            fade = CARD_FADE
+        elif shot.kind == "image":
+            # the image proxy is already EXIF-rotated and fitted to the canvas
+            src = build_proxy(shot.path) or Path(shot.path)
+            inputs += ["-loop", "1", "-framerate", str(FPS), "-t", f"{dur:.3f}", "-i", str(src)]
+            normalize = (
+                f"scale={w}:-2,crop={w}:'min(ih,{h})',"
+                f"pad={w}:{h}:-1:-1:black,fps={FPS},format=yuv420p,setsar=1,"
+                f"trim=duration={dur:.3f},setpts=PTS-STARTPTS"
+            )
+            fade = IMAGE_FADE
+        else:
+            src = fresh_proxy(shot.path) or Path(shot.path)
+            inputs += ["-t", f"{dur:.3f}", "-i", str(src)]
+            if _has_audio(shot, src):
+                audio_src = f"[{i}:a]"
+            fade = VIDEO_FADE
+
+        filters.append(f"[{i}:v]{normalize},fade=t=in:st=0:d={fade}[v{i}]")
+        if audio_src:
+            filters.append(
+                f"{audio_src}aformat=sample_rates={AUDIO_RATE}:channel_layouts=stereo,"
+                f"atrim=duration={dur:.3f},asetpts=PTS-STARTPTS,"
+                f"apad=whole_dur={dur:.3f}[a{i}]"
+            )
+        else:
+            filters.append(
+                f"anullsrc=r={AUDIO_RATE}:cl=stereo,atrim=duration={dur:.3f}[a{i}]"
+            )
+        labels.append(f"[v{i}][a{i}]")
+
+    n = len(script.shots)
+    filters.append(f"{''.join(labels)}concat=n={n}:v=1:a=1[vout][aout]")
+
+    return [
+        ffmpeg_exe(), "-y", "-v", "error",
+        *inputs,
+        "-filter_complex", ";".join(filters),
+        "-map", "[vout]", "-map", "[aout]",
+        "-r", str(FPS),
+        "-c:v", VIDEO_CODEC, "-preset", PRESET, "-b:v", BITRATE,
+        *FFMPEG_PARAMS,
+        "-c:a", AUDIO_CODEC, "-ar", str(AUDIO_RATE), "-ac", "2",
+        *FASTSTART_PARAMS,
+        str(output_path),
+    ]
+
+
+def render_trailer_ffmpeg(script: TrailerScript, output_path: str | Path) -> None:
+    """Render the whole script with a single ffmpeg filter_complex subprocess."""
+    output_path = Path(output_path)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    if not script.shots:
+        raise ValueError("Cannot render an empty script")
+
+    with tempfile.TemporaryDirectory(dir=output_path.parent) as tmpdir:
+        tmp_out = Path(tmpdir) / "out.mp4"
+        cmd = build_ffmpeg_command(script, tmp_out, Path(tmpdir))
+        proc = subprocess.run(cmd, capture_output=True, text=True)
+        if proc.returncode != 0:
+            raise RuntimeError(f"ffmpeg render failed: {proc.stderr.strip()[-2000:]}")
+        os.replace(tmp_out, output_path)
@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+import shutil
+import subprocess
+import tempfile
+import uuid
+from pathlib import Path
+
+from app.utils.helpers import ffmpeg_exe
+from app.video_composer.settings import HLS_SEGMENT_SECONDS
+
+PLAYLIST_NAME = "index.m3u8"
+
+
+def package_hls(mp4_path: str | Path, out_dir: str | Path, segment_seconds: int | None = None) -> Path:
+    """
+    Remux a rendered wrap-up into an HLS VOD rendition (playlist + short
+    MPEG-TS segments) in `out_dir`, without re-encoding. Segments are cut at
+    keyframes, which the encoder places every two seconds.
+
+    The rendition is written next to `out_dir` and swapped in at the end,
+    so a player never sees a half-written playlist. Returns the playlist path.
+    """
+    mp4_path = Path(mp4_path)
+    out_dir = Path(out_dir)
+    out_dir.parent.mkdir(parents=True, exist_ok=True)
+    seconds = segment_seconds or HLS_SEGMENT_SECONDS
+
+    tmp_dir = Path(tempfile.mkdtemp(prefix=f".{out_dir.name}.", dir=out_dir.parent))
+    try:
+        proc = subprocess.run(
+            [
+                ffmpeg_exe(), "-y", "-v", "error",
+                "-i", str(mp4_path),
+                "-c", "copy",
+                "-f", "hls",
+                "-hls_time", str(seconds),
+                "-hls_playlist_type", "vod",
+                "-hls_segment_filename", str(tmp_dir / "seg_%04d.ts"),
+                str(tmp_dir / PLAYLIST_NAME),
+            ],
+            capture_output=True,
+            text=True,
+        )
+        if proc.returncode != 0:
+            raise RuntimeError(f"HLS packaging failed: {proc.stderr.strip()[-2000:]}")
+        _swap_in(tmp_dir, out_dir)
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    return out_dir / PLAYLIST_NAME
+
+
+def _swap_in(new_dir: Path, out_dir: Path) -> None:
+    """
+    Replace `out_dir` with `new_dir` using two renames, so `out_dir` is
+    only ever missing for an instant and never half-deleted. The old
+    rendition is removed afterwards.
+    """
+    old_dir = None
+    if out_dir.exists():
+        old_dir = out_dir.with_name(f".{out_dir.name}.old-{uuid.uuid4().hex}")
+        out_dir.rename(old_dir)
+    try:
+        new_dir.rename(out_dir)
+    except OSError:
+        if old_dir is not None:
+            old_dir.rename(out_dir)
+        raise
+    if old_dir is not None:
+        remove_hls(old_dir)
+
+
+def remove_hls(out_dir: str | Path) -> None:
+    shutil.rmtree(out_dir, ignore_errors=True)
@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+import logging
+import os
+import subprocess
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from app.media_processing.preprocess import fit_image_to_canvas
+from app.utils.helpers import ffmpeg_exe, list_media_files
+from app.video_composer.settings import FPS, VIDEO_SIZE
+
+log = logging.getLogger(__name__)
+
+# proxies live next to the originals, in a hidden folder the loader skips
+PROXY_DIR_NAME = ".proxies"
+IMAGE_EXTS = {".jpg", ".jpeg", ".png"}
+
+
+def proxy_path(src: Path) -> Path:
+    """day_media/<day>/.proxies/<name>.mp4 (videos) or <name>.jpg (images)."""
+    src = Path(src)
+    ext = ".jpg" if src.suffix.lower() in IMAGE_EXTS else ".mp4"
+    return src.parent / PROXY_DIR_NAME / f"{src.name}{ext}"
+
+
+def fresh_proxy(src: Path) -> Path | None:
+    """The proxy for `src` if it exists and is newer than the original."""
+    p = proxy_path(src)
+    try:
+        if p.stat().st_mtime >= Path(src).stat().st_mtime:
+            return p
+    except OSError:
+        pass
+    return None
+
+
+def _build_image_proxy(src: Path, dst: Path) -> None:
+    # unique per call: an upload thread and a render can build the same proxy
+    tmp = dst.with_name(f"{dst.stem}.{uuid.uuid4().hex}.tmp.jpg")
+    fit_image_to_canvas(src, VIDEO_SIZE).save(tmp, format="JPEG", quality=92)
+    os.replace(tmp, dst)
+
+
+def _build_video_proxy(src: Path, dst: Path) -> None:
+    """Fit into 1080x1920 (pad, no crop), 24 fps, yuv420p H.264 + AAC."""
+    w, h = VIDEO_SIZE
+    vf = (
+        f"scale={w}:{h}:force_original_aspect_ratio=decrease,"
+        f"pad={w}:{h}:(ow-iw)/2:(oh-ih)/2:black,"
+        f"fps={FPS},format=yuv420p,setsar=1"
+    )
+    tmp = dst.with_name(f"{dst.stem}.{uuid.uuid4().hex}.tmp.mp4")
+    cmd = [
+        ffmpeg_exe(), "-y", "-v", "error",
+        "-i", str(src),
+        "-vf", vf,
+        "-c:v", "libx264", "-preset", "veryfast", "-crf", "20",
+        "-c:a", "aac", "-ar", "44100", "-ac", "2",
+        "-movflags", "+faststart",
+        str(tmp),
+    ]
+    try:
+        subprocess.run(cmd, check=True, capture_output=True)
+        os.replace(tmp, dst)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+
+
+def build_proxy(src: str | Path, force: bool = False) -> Path | None:
+    """
+    Create (or reuse) the normalized render proxy for one media file.
+    Returns None if the proxy could not be built; the renderer then falls
+    back to the original.
+    """
+    src = Path(src)
+    if not force:
+        existing = fresh_proxy(src)
+        if existing is not None:
+            return existing
+
+    dst = proxy_path(src)
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        if src.suffix.lower() in IMAGE_EXTS:
+            _build_image_proxy(src, dst)
+        else:
+            _build_video_proxy(src, dst)
+    except Exception as e:
+        log.warning("Failed to build proxy", extra={"src": str(src), "error": str(e)})
+        return None
+    return dst
+
+
+def ensure_day_proxies(day_dir: str | Path, max_workers: int = 2) -> int:
+    """Build any missing/stale proxies for a day; returns how many were built."""
+    todo = [p for p in list_media_files(day_dir)
+            if PROXY_DIR_NAME not in p.parts and fresh_proxy(p) is None]
+    if not todo:
+        return 0
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        built = sum(1 for r in pool.map(build_proxy, todo) if r is not None)
+    log.info("Built proxies", extra={"day_dir": str(day_dir), "built": built, "todo": len(todo)})
+    return built
@@ -0,0 +1,162 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import subprocess
+import tempfile
+from pathlib import Path
+
+from app.media_processing.hashing import file_sha256
+from app.story_engine.trailer_script import Shot
+from app.utils.helpers import ffmpeg_exe
+from app.video_composer.proxies import fresh_proxy
+from app.video_composer.settings import (
+    AUDIO_CODEC,
+    AUDIO_RATE,
+    BITRATE,
+    FASTSTART_PARAMS,
+    FFMPEG_PARAMS,
+    FPS,
+    PRESET,
+    VIDEO_CODEC,
+    encoder_signature,
+)
+
+SEGMENT_CACHE_DIR = Path(os.getenv("SEGMENT_CACHE_DIR", ".cache/segments"))
+# bump when the way a shot is turned into frames changes
+SEGMENT_FORMAT_VERSION = 1
+SEGMENT_CACHE_MAX_BYTES = int(os.getenv("SEGMENT_CACHE_MAX_MB", "5120")) << 20
+
+
+def segment_key(shot: Shot) -> str:
+    """
+    Hash of everything that determines a shot's encoded bytes: shot
+    parameters, the source file's content hash, whether it renders from a
+    proxy, and the encoder settings.
+    """
+    source_hash = None
+    from_proxy = False
+    if shot.path is not None:
+        source_hash = (shot.source.content_hash if shot.source else None) or file_sha256(shot.path)
+        from_proxy = fresh_proxy(shot.path) is not None
+    payload = {
+        "v": SEGMENT_FORMAT_VERSION,
+        "kind": shot.kind,
+        "duration": round(shot.duration, 3),
+        "text": shot.text,
+        "source": source_hash,
+        "proxy": from_proxy,
+        "encoder": encoder_signature(),
+    }
+    blob = json.dumps(payload, sort_keys=True, ensure_ascii=False).encode("utf-8")
+    return hashlib.sha256(blob).hexdigest()
+
+
+def segment_path(key: str) -> Path:
+    return SEGMENT_CACHE_DIR / key[:2] / f"{key}.mp4"
+
+
+def cached_segment(key: str) -> Path | None:
+    p = segment_path(key)
+    if p.exists():
+        os.utime(p)  # mark as recently used for pruning
+        return p
+    return None
+
+
+def write_segment(clip, dst: Path) -> Path:
+    """
+    Encode one full-frame clip as a standalone segment.
+
+    Video is written by MoviePy, then muxed with a stereo AAC track at a
+    fixed rate (silence if the shot has no audio) so every segment has
+    identical stream layouts and can be joined with concat stream copy.
+    """
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    with tempfile.TemporaryDirectory(dir=dst.parent) as tmpdir:
+        video_tmp = Path(tmpdir) / "video.mp4"
+        clip.write_videofile(
+            str(video_tmp),
+            fps=FPS,
+            codec=VIDEO_CODEC,
+            audio=False,
+            preset=PRESET,
+            bitrate=BITRATE,
+            ffmpeg_params=FFMPEG_PARAMS,
+            logger=None,
+        )
+
+        if clip.audio is not None:
+            audio_tmp = Path(tmpdir) / "audio.wav"
+            clip.audio.write_audiofile(
+                str(audio_tmp), fps=AUDIO_RATE, nbytes=2, codec="pcm_s16le", logger=None
+            )
+            audio_input = ["-i", str(audio_tmp)]
+        else:
+            audio_input = [
+                "-f", "lavfi", "-t", f"{clip.duration:.3f}",
+                "-i", f"anullsrc=r={AUDIO_RATE}:cl=stereo",
+            ]
+
+        out_tmp = Path(tmpdir) / "segment.mp4"
+        subprocess.run(
+            [
+                ffmpeg_exe(), "-y", "-v", "error",
+                "-i", str(video_tmp), *audio_input,
+                "-map", "0:v:0", "-map", "1:a:0",
+                "-c:v", "copy",
+                "-c:a", AUDIO_CODEC, "-ar", str(AUDIO_RATE), "-ac", "2",
+                "-shortest",
+                str(out_tmp),
+            ],
+            check=True,
+            capture_output=True,
+        )
+        os.replace(out_tmp, dst)
+    return dst
+
+
+def concat_segments(segments: list[Path], output_path: Path) -> None:
+    """Join encoded segments without re-encoding (ffmpeg concat demuxer)."""
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    with tempfile.NamedTemporaryFile(
+        "w", suffix=".txt", delete=False, encoding="utf-8"
+    ) as f:
+        for seg in segments:
+            escaped = str(Path(seg).resolve()).replace("'", "'\\''")
+            f.write(f"file '{escaped}'\n")
+        list_path = Path(f.name)
+    tmp_out = output_path.with_name(f".{output_path.stem}.{os.getpid()}.tmp.mp4")
+    try:
+        subprocess.run(
+            [
+                ffmpeg_exe(), "-y", "-v", "error",
+                "-f", "concat", "-safe", "0", "-i", str(list_path),
+                "-c", "copy",
+                *FASTSTART_PARAMS,
+                str(tmp_out),
+            ],
+            check=True,
+            capture_output=True,
+        )
+        os.replace(tmp_out, output_path)
+    finally:
+        list_path.unlink(missing_ok=True)
+        tmp_out.unlink(missing_ok=True)
+
+
+def prune_segment_cache(max_bytes: int = SEGMENT_CACHE_MAX_BYTES) -> int:
+    """Delete least recently used segments until the cache fits `max_bytes`."""
+    if not SEGMENT_CACHE_DIR.exists():
+        return 0
+    files = [(p, p.stat()) for p in SEGMENT_CACHE_DIR.glob("*/*.mp4")]
+    total = sum(st.st_size for _, st in files)
+    removed = 0
+    for p, st in sorted(files, key=lambda x: x[1].st_mtime):
+        if total <= max_bytes:
+            break
+        p.unlink(missing_ok=True)
+        total -= st.st_size
+        removed += 1
+    return removed
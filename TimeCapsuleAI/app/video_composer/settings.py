@@ -0,0 +1,40 @@
+from __future__ import annotations
+
+import os
+
+VIDEO_SIZE = (1080, 1920)  # (width, height) for vertical video
+FPS = 24
+
+# encoder settings shared by every writer (full renders and cached segments)
+VIDEO_CODEC = "libx264"
+AUDIO_CODEC = "aac"
+AUDIO_RATE = 44100
+PRESET = "superfast"     # faster encoding (bigger file but fine for dev)
+BITRATE = "2000k"
+FFMPEG_PARAMS = [
+    "-profile:v", "baseline",  # simpler profile
+    "-level", "3.0",           # low-ish level
+    "-pix_fmt", "yuv420p",     # widely supported pixel format
+    "-g", str(FPS * 2),        # keyframe every 2s: quick seeks, short HLS segments
+]
+# final outputs only: moov atom up front so players can start before the
+# whole file has downloaded (segments skip it, they're rewritten by concat)
+FASTSTART_PARAMS = ["-movflags", "+faststart"]
+
+# HLS rendition of each wrap-up (WRAPUP_HLS=1); segments cut on keyframes
+HLS_ENABLED = os.getenv("WRAPUP_HLS", "0") == "1"
+HLS_SEGMENT_SECONDS = int(os.getenv("HLS_SEGMENT_SECONDS", "2"))
+
+
+def encoder_signature() -> dict:
+    """Everything that changes encoded output; part of segment cache keys."""
+    return {
+        "size": VIDEO_SIZE,
+        "fps": FPS,
+        "vcodec": VIDEO_CODEC,
+        "acodec": AUDIO_CODEC,
+        "arate": AUDIO_RATE,
+        "preset": PRESET,
+        "bitrate": BITRATE,
+        "params": FFMPEG_PARAMS,
+    }
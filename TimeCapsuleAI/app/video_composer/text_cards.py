@@ -0,0 +1,163 @@
+from __future__ import annotations
+
+from functools import lru_cache
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+from app.video_composer.settings import VIDEO_SIZE
+
+# title/poem cards are held on screen for a fixed time
+CARD_DURATION = 5
+# e.g. warm orange -> dark purple
+CARD_GRADIENT = ((160, 80, 0), (40, 0, 70))
+CARD_FONT_SIZE = 48
+LINE_SPACING = 10
+
+Gradient = tuple[tuple[int, int, int], tuple[int, int, int]]
+
+
+# ---------- Text rendering helpers (no ImageMagick needed) ----------
+
+@lru_cache(maxsize=16)
+def load_font(font_size: int) -> ImageFont.FreeTypeFont | ImageFont.ImageFont:
+    """
+    Try to load a TTF font; fall back to default bitmap font if not found.
+    Cached per size, so the TTF is opened once per process.
+    """
+    # Try common Windows font first
+    for font_name in ["arial.ttf", "ARIAL.TTF"]:
+        try:
+            return ImageFont.truetype(font_name, font_size)
+        except OSError:
+            continue
+
+    # Fallback: default PIL font
+    return ImageFont.load_default()
+
+
+@lru_cache(maxsize=4)
+def _background(size: tuple[int, int], gradient: Gradient | None) -> np.ndarray:
+    """
+    Vertical gradient (or solid black) as a read-only (h, w, 3) uint8 array.
+    Cached: a render only ever uses one or two backgrounds.
+    """
+    w, h = size
+    if gradient is None:
+        bg = np.zeros((h, w, 3), dtype=np.uint8)
+        bg.setflags(write=False)
+        return bg
+    start = np.array(gradient[0], dtype=np.float64)
+    end = np.array(gradient[1], dtype=np.float64)
+    t = np.linspace(0.0, 1.0, h)[:, None]
+    # truncate like int() did in the old per-row loop
+    rows = np.trunc(start + (end - start) * t).astype(np.uint8)
+    bg = np.broadcast_to(rows[:, None, :], (h, w, 3)).copy()
+    bg.setflags(write=False)
+    return bg
+
+
+def _layout(
+    draw: ImageDraw.ImageDraw,
+    text: str,
+    font,
+    max_width: int,
+) -> list[tuple[str, int, int]]:
+    """Greedy word wrap; returns (line, width, height), measuring each string once."""
+    words = text.split()
+    if not words:
+        return []
+
+    measured: dict[str, tuple[int, int]] = {}
+
+    def measure(s: str) -> tuple[int, int]:
+        if s not in measured:
+            left, top, right, bottom = draw.textbbox((0, 0), s, font=font)
+            measured[s] = (right - left, bottom - top)
+        return measured[s]
+
+    lines: list[str] = []
+    current = words[0]
+    for word in words[1:]:
+        test_line = current + " " + word
+        if measure(test_line)[0] > max_width:
+            lines.append(current)
+            current = word
+        else:
+            current = test_line
+    lines.append(current)
+
+    return [(line, *measure(line)) for line in lines]
+
+
+# a render shows two cards (title and poem); a few finished frames are
+# enough to reuse them across backends and reruns without holding many
+@lru_cache(maxsize=4)
+def _text_frame(
+    text: str,
+    size: tuple[int, int],
+    font_size: int,
+    margin: int,
+    gradient: Gradient | None,
+) -> np.ndarray:
+    w, h = size
+    img = Image.fromarray(_background(size, gradient).copy())
+    draw = ImageDraw.Draw(img)
+    font = load_font(font_size)
+
+    lines = _layout(draw, text, font, w - 2 * margin)
+    if lines:
+        total_text_height = sum(lh for _, _, lh in lines) + (len(lines) - 1) * LINE_SPACING
+        y = (h - total_text_height) // 2
+        for line, lw, lh in lines:
+            draw.text(((w - lw) // 2, y), line, font=font, fill=(255, 255, 255))
+            y += lh + LINE_SPACING
+
+    frame = np.asarray(img)
+    frame.setflags(write=False)
+    return frame
+
+
+def text_frame(
+    text: str,
+    size: tuple[int, int] = VIDEO_SIZE,
+    font_size: int = 60,
+    margin: int = 80,
+    gradient: Gradient | None = None,
+) -> np.ndarray:
+    """
+    Centered multiline text on a vertical gradient, as a read-only RGB array.
+    Memoized on (text, size, font_size, margin, gradient), a few frames at a
+    time; the background is cached separately per (size, gradient).
+    """
+    if gradient is not None:
+        gradient = (tuple(gradient[0]), tuple(gradient[1]))
+    return _text_frame(text, tuple(size), font_size, margin, gradient)
+
+
+def make_text_image(
+    text: str,
+    size: tuple[int, int] = VIDEO_SIZE,
+    font_size: int = 60,
+    margin: int = 80,
+    gradient: Gradient | None = None,
+) -> Image.Image:
+    """
+    Create an image with a vertical gradient background and centered multiline text.
+    gradient: ((r1,g1,b1), (r2,g2,b2)) or None for solid black.
+    """
+    return Image.fromarray(text_frame(text, size, font_size, margin, gradient))
+
+
+def card_frame(text: str) -> np.ndarray:
+    """The title/poem card frame used by every render backend."""
+    return text_frame(
+        text,
+        size=VIDEO_SIZE,
+        font_size=CARD_FONT_SIZE,
+        gradient=CARD_GRADIENT,
+    )
+
+
+def card_image(text: str) -> Image.Image:
+    return Image.fromarray(card_frame(text))
@@ -1,8 +1,231 @@
-import requests
-BASE_URL = "http://10.10.14.25:8000"
-day = "2025-11-30"
-resp = requests.post(
-    f"{BASE_URL}/generate_wrapup",
-    params={"force": "true", "day": day}, 
-)
-print(resp.status_code, resp.json())
+"""
+Backfill wrap-up videos for many days, in parallel, without the HTTP API.
+
+    python batch_generate_wrapups.py --missing
+    python batch_generate_wrapups.py --start 2025-11-01 --end 2025-11-30 --workers 3
+    python batch_generate_wrapups.py --start 2025-11-30 --end 2025-11-30   # one day
+
+Days are taken from day_media/ (optionally limited to --start/--end).
+With --missing, days whose video is newer than their newest media are left
+alone. Progress is checkpointed to a JSON file after every day, together
+with the day's newest media mtime and the render settings, so running the
+same command again after an interruption only does the days that haven't
+finished. A day is redone once its media or the settings change;
+--restart ignores the checkpoint entirely.
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date, datetime
+from pathlib import Path
+
+DEFAULT_CHECKPOINT = Path(".cache") / "backfill_checkpoint.json"
+
+
+def _init_worker() -> None:
+    from app.utils.logs import configure_logging
+
+    configure_logging()
+
+
+def _backfill_day(day: str, force_new_poem: bool = False) -> dict:
+    """Render one day in a worker process."""
+    from main import get_wrapup_output_path, run_daily_wrapup
+
+    start = time.perf_counter()
+    output = run_daily_wrapup(
+        output_path=get_wrapup_output_path(day),
+        day=day,
+        force_new_poem=force_new_poem,
+    )
+    return {
+        "status": "done" if output else "no_media",
+        "output": output or None,
+        "seconds": round(time.perf_counter() - start, 2),
+    }
+
+
+def _load_checkpoint(path: Path) -> dict:
+    if not path.exists():
+        return {"days": {}}
+    try:
+        data = json.loads(path.read_text(encoding="utf-8"))
+    except Exception as e:
+        print(f"Ignoring unreadable checkpoint {path}: {e}")
+        return {"days": {}}
+    data.setdefault("days", {})
+    return data
+
+
+def _save_checkpoint(path: Path, data: dict) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    tmp.write_text(json.dumps(data, indent=2, ensure_ascii=False), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def render_signature() -> str:
+    """Hash of the settings that change a rendered wrap-up."""
+    from app.story_engine.wrapup_llm import POEM_PROMPT_VERSION, TEXT_MODEL_NAME
+    from app.video_composer.segments import SEGMENT_FORMAT_VERSION
+    from app.video_composer.settings import FASTSTART_PARAMS, HLS_ENABLED, encoder_signature
+
+    payload = json.dumps(
+        {
+            "encoder": encoder_signature(),
+            "faststart": FASTSTART_PARAMS,
+            "hls": HLS_ENABLED,
+            "segments": SEGMENT_FORMAT_VERSION,
+            "backend": os.getenv("RENDER_BACKEND", "moviepy"),
+            "poem_prompt": POEM_PROMPT_VERSION,
+            "text_model": TEXT_MODEL_NAME,
+        },
+        sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+def _media_mtime(day: str) -> float | None:
+    from main import MEDIA_ROOT, newest_media_mtime
+
+    return newest_media_mtime(MEDIA_ROOT / day)
+
+
+def _already_done(record: dict | None, media_mtime: float | None, signature: str) -> bool:
+    """Checkpointed as finished, for the same media and the same render settings."""
+    return (
+        record is not None
+        and record.get("status") in ("done", "no_media")
+        and record.get("media_mtime") == media_mtime
+        and record.get("settings") == signature
+    )
+
+
+def select_days(start: str | None, end: str | None, missing: bool) -> list[str]:
+    from main import list_media_days, wrapup_is_stale
+
+    days = [
+        d for d in list_media_days()
+        if (start is None or d >= start) and (end is None or d <= end)
+    ]
+    if missing:
+        days = [d for d in days if wrapup_is_stale(d)]
+    return days
+
+
+def _split_budget(workers: int) -> None:
+    """
+    Each worker runs its own ingest/render pools and Gemini rate limiter;
+    share the machine and the quota between them unless told otherwise.
+    Must run before anything imports main or app.*: the worker counts are
+    read into module constants at import time, and forked workers inherit
+    those modules as they are.
+    """
+    cpus = os.cpu_count() or 2
+    os.environ.setdefault("RENDER_WORKERS", str(max(1, cpus // workers - 1)))
+    os.environ.setdefault("INGEST_WORKERS", str(max(1, cpus // workers)))
+    os.environ.setdefault("GEMINI_RPM", str(60 / workers))
+
+
+def _iso_day(value: str) -> str:
+    return date.fromisoformat(value).isoformat()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--start", type=_iso_day, help="first day (YYYY-MM-DD), inclusive")
+    parser.add_argument("--end", type=_iso_day, help="last day (YYYY-MM-DD), inclusive")
+    parser.add_argument("--missing", action="store_true",
+                        help="only days with no wrap-up or one older than their media")
+    parser.add_argument("--workers", type=int, default=int(os.getenv("WRAPUP_WORKERS", "2")),
+                        help="days rendered at the same time (default: WRAPUP_WORKERS or 2)")
+    parser.add_argument("--checkpoint", type=Path, default=DEFAULT_CHECKPOINT)
+    parser.add_argument("--restart", action="store_true", help="ignore the existing checkpoint")
+    parser.add_argument("--new-poems", action="store_true",
+                        help="write fresh poems instead of reusing cached ones")
+    parser.add_argument("--dry-run", action="store_true", help="list the days and exit")
+    args = parser.parse_args()
+
+    workers = max(1, args.workers)
+    # first, before select_days() imports main and with it the pipeline
+    _split_budget(workers)
+    days = select_days(args.start, args.end, args.missing)
+
+    signature = render_signature()
+    mtimes = {d: _media_mtime(d) for d in days}
+    checkpoint = {"days": {}} if args.restart else _load_checkpoint(args.checkpoint)
+    if args.missing:
+        # staleness is the checkpoint here: finished days are no longer stale,
+        # and a stale day is always redone whatever an old run recorded
+        todo = list(days)
+    else:
+        todo = [
+            d for d in days
+            if not _already_done(checkpoint["days"].get(d), mtimes[d], signature)
+        ]
+    skipped = len(days) - len(todo)
+
+    print(f"{len(days)} day(s) selected, {skipped} already done, {len(todo)} to render "
+          f"with {workers} worker(s).")
+    if args.dry_run:
+        for d in todo:
+            print(" ", d)
+        return 0
+    if not todo:
+        return 0
+
+    checkpoint["started_at"] = datetime.now().isoformat(timespec="seconds")
+    _save_checkpoint(args.checkpoint, checkpoint)
+
+    results: dict[str, dict] = {}
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=min(workers, len(todo)), initializer=_init_worker) as pool:
+        futures = {pool.submit(_backfill_day, d, args.new_poems): d for d in todo}
+        try:
+            for n, fut in enumerate(as_completed(futures), 1):
+                day = futures[fut]
+                try:
+                    result = fut.result()
+                except Exception as e:
+                    result = {"status": "failed", "error": f"{type(e).__name__}: {e}"}
+                result["finished_at"] = datetime.now().isoformat(timespec="seconds")
+                result["media_mtime"] = mtimes[day]
+                result["settings"] = signature
+                results[day] = result
+                checkpoint["days"][day] = result
+                _save_checkpoint(args.checkpoint, checkpoint)
+                detail = result.get("error") or f"{result.get('seconds', 0):.1f}s"
+                print(f"[{n}/{len(todo)}] {day}: {result['status']} ({detail})")
+        except KeyboardInterrupt:
+            # don't sit through the queued days; workers got the SIGINT too
+            pool.shutdown(wait=False, cancel_futures=True)
+            print("\nInterrupted; finished days are checkpointed, rerun to resume.")
+
+    elapsed = time.perf_counter() - start
+    done = [d for d, r in results.items() if r["status"] == "done"]
+    failed = [d for d, r in results.items() if r["status"] == "failed"]
+    render_s = sum(r.get("seconds", 0.0) for r in results.values())
+
+    print("\nBackfill summary")
+    print(f"  rendered:   {len(done)}")
+    print(f"  no media:   {sum(1 for r in results.values() if r['status'] == 'no_media')}")
+    print(f"  failed:     {len(failed)}")
+    print(f"  skipped:    {skipped} (already in checkpoint)")
+    print(f"  remaining:  {len(todo) - len(results)}")
+    print(f"  wall time:  {elapsed:.1f}s")
+    if results and elapsed > 0:
+        print(f"  throughput: {len(results) / elapsed * 3600:.1f} days/hour "
+              f"({render_s / len(results):.1f}s per day, {render_s / elapsed:.2f}x parallel)")
+    for d in failed:
+        print(f"  FAILED {d}: {results[d]['error']}")
+    return 1 if failed or len(results) < len(todo) else 0
+
+
+if __name__ == "__main__":
+    _init_worker()
+    raise SystemExit(main())
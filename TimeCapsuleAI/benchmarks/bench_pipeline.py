@@ -0,0 +1,236 @@
+"""
+End-to-end wrap-up pipeline benchmark on a synthetic day.
+
+    python -m benchmarks.bench_pipeline --images 150 --videos 6 --latency 0.8
+    python -m benchmarks.bench_pipeline --resolutions 4032x3024,1920x1080 --runs 2 -o bench.json
+
+Gemini is replaced by a local fake with configurable latency. For each
+stage (load_day_media, caption_day_media, build_day_story,
+build_trailer_script, render_trailer) we report wall time, CPU time
+(this process and child processes) and peak RSS, as JSON so runs can be
+compared across commits. Run 1 is cold; later runs reuse the caches.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+REPO_DIR = Path(__file__).resolve().parent.parent
+
+
+def _rss_bytes() -> int | None:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import psutil
+    except ImportError:
+        return None
+    return psutil.Process().memory_info().rss
+
+
+class _PeakRss(threading.Thread):
+    """Samples this process's RSS until stopped and keeps the maximum."""
+
+    def __init__(self, interval: float = 0.02):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.peak = _rss_bytes() or 0
+        self._stop_event = threading.Event()
+
+    def run(self) -> None:
+        while not self._stop_event.wait(self.interval):
+            rss = _rss_bytes()
+            if rss is not None and rss > self.peak:
+                self.peak = rss
+
+    def stop(self) -> int:
+        self._stop_event.set()
+        self.join()
+        return self.peak
+
+
+@contextmanager
+def _measure(results: dict, stage: str):
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    sampler = _PeakRss()
+    sampler.start()
+    cpu = time.process_time()
+    wall = time.perf_counter()
+    try:
+        yield
+    finally:
+        wall = time.perf_counter() - wall
+        cpu = time.process_time() - cpu
+        peak = sampler.stop()
+        children_after = resource.getrusage(resource.RUSAGE_CHILDREN)
+        results[stage] = {
+            "wall_s": round(wall, 4),
+            "cpu_s": round(cpu, 4),
+            "children_cpu_s": round(
+                (children_after.ru_utime + children_after.ru_stime)
+                - (children.ru_utime + children.ru_stime),
+                4,
+            ),
+            "peak_rss_mb": round(peak / 2**20, 1),
+            # lifetime maximum over all reaped children (Linux reports KB)
+            "children_max_rss_mb": round(children_after.ru_maxrss / 1024, 1),
+        }
+
+
+def _parse_resolutions(raw: str) -> tuple[tuple[int, int], ...]:
+    out = []
+    for item in raw.split(","):
+        w, _, h = item.strip().lower().partition("x")
+        out.append((int(w), int(h)))
+    return tuple(out)
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=REPO_DIR, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_once(day_dir: Path, output: Path) -> dict:
+    from app.media_processing.loader import load_day_media
+    from app.media_processing.vision import caption_day_media
+    from app.story_engine.story_generator import build_day_story
+    from app.story_engine.trailer_script import build_trailer_script
+    from app.video_composer.composer import render_trailer
+    from benchmarks.fake_gemini import FakeGenerativeModel
+
+    FakeGenerativeModel.reset()
+    stages: dict = {}
+    start = time.perf_counter()
+
+    with _measure(stages, "load_day_media"):
+        media = load_day_media(day_dir)
+    with _measure(stages, "caption_day_media"):
+        captions = caption_day_media(media)
+    with _measure(stages, "build_day_story"):
+        story = build_day_story(captions)
+    with _measure(stages, "build_trailer_script"):
+        script = build_trailer_script(media, title=story["title"], poem=story["poem"])
+    with _measure(stages, "render_trailer"):
+        render_trailer(script, output)
+
+    return {
+        "total_wall_s": round(time.perf_counter() - start, 4),
+        "media": len(media),
+        "shots": len(script.shots),
+        "video_seconds": round(script.total_duration, 2),
+        "gemini_calls": FakeGenerativeModel.calls,
+        "gemini_bytes": FakeGenerativeModel.bytes_sent,
+        "output_bytes": output.stat().st_size if output.exists() else None,
+        "stages": stages,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--images", type=int, default=30)
+    parser.add_argument("--videos", type=int, default=3)
+    parser.add_argument("--resolutions", default="4032x3024",
+                        help="comma-separated WxH list, cycled over the images")
+    parser.add_argument("--clip-seconds", type=float, default=3.0)
+    parser.add_argument("--no-exif", action="store_true", help="omit EXIF time/GPS")
+    parser.add_argument("--latency", type=float, default=0.5,
+                        help="seconds per fake Gemini call")
+    parser.add_argument("--rpm", type=float, default=100000,
+                        help="GEMINI_RPM for the rate limiter (default: effectively off)")
+    parser.add_argument("--runs", type=int, default=1)
+    parser.add_argument("--workdir", type=Path,
+                        help="keep generated media and caches here (default: temp dir)")
+    parser.add_argument("-o", "--output", type=Path, help="write JSON here instead of stdout")
+    args = parser.parse_args()
+
+    # caches and relative paths resolve against the working directory,
+    # so the benchmark runs in an isolated one
+    os.environ.setdefault("GOOGLE_API_KEY", "benchmark")
+    os.environ["GEMINI_RPM"] = str(args.rpm)
+    sys.path.insert(0, str(REPO_DIR))
+
+    from app.utils.logs import configure_logging
+    from benchmarks import fake_gemini
+    from benchmarks.synthetic import make_day
+
+    # pipeline logs go to stderr; stdout stays the JSON report
+    configure_logging()
+
+    fake_gemini.install(args.latency)
+
+    tmp = None
+    workdir = args.workdir
+    if workdir is None:
+        tmp = tempfile.TemporaryDirectory()
+        workdir = Path(tmp.name)
+    workdir = workdir.resolve()
+    workdir.mkdir(parents=True, exist_ok=True)
+    output_file = args.output.resolve() if args.output else None
+    os.chdir(workdir)
+
+    try:
+        day_dir = workdir / "day_media" / "2025-01-01"
+        gen_start = time.perf_counter()
+        if not day_dir.exists():
+            make_day(
+                day_dir,
+                images=args.images,
+                videos=args.videos,
+                resolutions=_parse_resolutions(args.resolutions),
+                clip_seconds=args.clip_seconds,
+                exif=not args.no_exif,
+            )
+        generate_s = time.perf_counter() - gen_start
+
+        runs = [
+            run_once(day_dir, workdir / "static" / f"timecapsule_bench_{i}.mp4")
+            for i in range(args.runs)
+        ]
+    finally:
+        if tmp is not None:
+            os.chdir(REPO_DIR)
+            tmp.cleanup()
+
+    report = {
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "params": {
+            "images": args.images,
+            "videos": args.videos,
+            "resolutions": args.resolutions,
+            "clip_seconds": args.clip_seconds,
+            "exif": not args.no_exif,
+            "latency_s": args.latency,
+        },
+        "generate_s": round(generate_s, 3),
+        "runs": runs,
+    }
+    text = json.dumps(report, indent=2)
+    if output_file:
+        output_file.write_text(text + "\n", encoding="utf-8")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
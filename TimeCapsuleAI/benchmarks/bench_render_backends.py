@@ -0,0 +1,68 @@
+"""
+Compare the MoviePy and ffmpeg render backends on the same TrailerScript.
+
+    python -m benchmarks.bench_render_backends --images 20 --videos 3
+    python -m benchmarks.bench_render_backends --day day_media/2025-11-30
+
+Prints one JSON object with wall time per backend.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import tempfile
+import time
+from pathlib import Path
+
+from app.media_processing.loader import load_day_media
+from app.story_engine.trailer_script import build_trailer_script
+from app.utils.logs import configure_logging
+from app.video_composer.composer import render_trailer
+from benchmarks.synthetic import make_clip, make_image
+
+POEM = "Morning light on the table\nA walk that ran long\nLaughter in the dark"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--day", type=Path, help="existing day folder (default: synthetic)")
+    parser.add_argument("--images", type=int, default=20)
+    parser.add_argument("--videos", type=int, default=3)
+    parser.add_argument("--repeat", type=int, default=1)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        day = args.day
+        if day is None:
+            day = tmp / "day"
+            day.mkdir()
+            for i in range(args.images):
+                make_image(day / f"img_{i:03d}.jpg", (3024, 4032), seed=i)
+            for i in range(args.videos):
+                make_clip(day / f"clip_{i:03d}.mp4")
+
+        media = load_day_media(day, use_manifest=False)
+        script = build_trailer_script(media, title="A Day of Benchmarks", poem=POEM)
+
+        results = {"media": len(media), "shots": len(script.shots), "backends": {}}
+        for backend in ("moviepy", "ffmpeg"):
+            times = []
+            for r in range(args.repeat):
+                out = tmp / f"{backend}_{r}.mp4"
+                start = time.perf_counter()
+                # no segment cache: measure a full render on both sides
+                render_trailer(script, out, backend=backend, segment_cache=False)
+                times.append(round(time.perf_counter() - start, 3))
+            results["backends"][backend] = {
+                "wall_s": times,
+                "best_s": min(times),
+                "bytes": out.stat().st_size,
+            }
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    configure_logging()
+    main()
@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+import json
+import threading
+import time
+from dataclasses import dataclass
+
+import google.generativeai as genai
+
+
+@dataclass
+class FakeResponse:
+    text: str
+
+
+class FakeGenerativeModel:
+    """
+    Local stand-in for genai.GenerativeModel: sleeps `latency` seconds per
+    call and returns a canned answer. Counts calls and payload bytes so
+    benchmarks can report them.
+    """
+
+    latency = 0.5
+    calls = 0
+    bytes_sent = 0
+    _lock = threading.Lock()
+
+    def __init__(self, model_name: str, **kwargs):
+        self.model_name = model_name
+
+    def generate_content(self, contents, generation_config=None, **kwargs) -> FakeResponse:
+        parts = contents if isinstance(contents, list) else [contents]
+        images = [p for p in parts if isinstance(p, dict) and "data" in p]
+        payload = sum(len(p["data"]) for p in images)
+        with FakeGenerativeModel._lock:
+            FakeGenerativeModel.calls += 1
+            FakeGenerativeModel.bytes_sent += payload
+        time.sleep(self.latency)
+
+        caption = "A quiet moment with warm light and soft colors."
+        if (generation_config or {}).get("response_mime_type") == "application/json":
+            return FakeResponse(json.dumps([
+                {"index": n, "caption": caption} for n in range(1, len(images) + 1)
+            ]))
+        if payload:
+            return FakeResponse(caption)
+        return FakeResponse(
+            "Morning spilled across the table,\n"
+            "the day kept its small promises,\n"
+            "and evening folded everything away."
+        )
+
+    @classmethod
+    def reset(cls) -> None:
+        with cls._lock:
+            cls.calls = 0
+            cls.bytes_sent = 0
+
+
+def install(latency: float) -> None:
+    """Patch google.generativeai so the pipeline talks to the fake."""
+    FakeGenerativeModel.latency = latency
+    genai.configure = lambda **kwargs: None
+    genai.GenerativeModel = FakeGenerativeModel
@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+import subprocess
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+from app.utils.helpers import ffmpeg_exe
+
+
+_EXIF_IFD = 0x8769
+_GPS_IFD = 0x8825
+_DATETIME_ORIGINAL = 36867
+
+
+def _exif(taken_at: datetime, gps: tuple[float, float] | None) -> Image.Exif:
+    exif = Image.Exif()
+    exif.get_ifd(_EXIF_IFD)[_DATETIME_ORIGINAL] = taken_at.strftime("%Y:%m:%d %H:%M:%S")
+    if gps is not None:
+        lat, lon = gps
+
+        def dms(v: float) -> tuple[float, float, float]:
+            v = abs(v)
+            d = int(v)
+            m = int((v - d) * 60)
+            return (float(d), float(m), round((v - d - m / 60) * 3600, 2))
+
+        exif.get_ifd(_GPS_IFD).update({
+            1: "N" if lat >= 0 else "S",
+            2: dms(lat),
+            3: "E" if lon >= 0 else "W",
+            4: dms(lon),
+        })
+    return exif
+
+
+def make_image(
+    path: Path,
+    size: tuple[int, int],
+    seed: int = 0,
+    taken_at: datetime | None = None,
+    gps: tuple[float, float] | None = None,
+) -> Path:
+    """A smooth random gradient with some noise (compresses like a photo)."""
+    rng = np.random.default_rng(seed)
+    w, h = size
+    x = np.linspace(0, 1, w, dtype=np.float32)[None, :, None]
+    y = np.linspace(0, 1, h, dtype=np.float32)[:, None, None]
+    base = rng.uniform(0, 255, size=(1, 1, 3)).astype(np.float32)
+    tilt = rng.uniform(-128, 128, size=(2, 1, 1, 3)).astype(np.float32)
+    arr = base + tilt[0] * x + tilt[1] * y + rng.normal(0, 8, size=(h, w, 3))
+    img = Image.fromarray(np.clip(arr, 0, 255).astype(np.uint8))
+    if taken_at is not None:
+        img.save(path, quality=90, exif=_exif(taken_at, gps))
+    else:
+        img.save(path, quality=90)
+    return path
+
+
+def make_clip(path: Path, seconds: float = 3.0, size: tuple[int, int] = (720, 1280), fps: int = 30) -> Path:
+    """Test-pattern clip with a sine audio track."""
+    w, h = size
+    subprocess.run(
+        [
+            ffmpeg_exe(), "-y", "-v", "error",
+            "-f", "lavfi", "-i", f"testsrc2=size={w}x{h}:rate={fps}:duration={seconds}",
+            "-f", "lavfi", "-i", f"sine=frequency=440:duration={seconds}",
+            "-c:v", "libx264", "-preset", "ultrafast", "-pix_fmt", "yuv420p",
+            "-c:a", "aac", "-shortest",
+            str(path),
+        ],
+        check=True,
+        capture_output=True,
+    )
+    return path
+
+
+def make_day(
+    root: Path,
+    images: int,
+    videos: int,
+    resolutions: tuple[tuple[int, int], ...] = ((4032, 3024),),
+    clip_seconds: float = 3.0,
+    exif: bool = True,
+    gps: bool = True,
+) -> Path:
+    """
+    Fill `root` with a synthetic day: `images` photos cycling through
+    `resolutions` (optionally with EXIF capture time / GPS) and `videos`
+    short test-pattern clips.
+    """
+    root.mkdir(parents=True, exist_ok=True)
+    start = datetime(2025, 1, 1, 8, 0, 0)
+    for i in range(images):
+        taken_at = start + timedelta(minutes=5 * i) if exif else None
+        where = (53.3498 + i * 1e-4, -6.2603) if exif and gps else None
+        make_image(
+            root / f"img_{i:04d}.jpg",
+            resolutions[i % len(resolutions)],
+            seed=i,
+            taken_at=taken_at,
+            gps=where,
+        )
+    for i in range(videos):
+        make_clip(root / f"clip_{i:03d}.mp4", seconds=clip_seconds)
+    return root
@@ -1,15 +1,31 @@
 from __future__ import annotations
 
+import logging
+import os
+import time
 from pathlib import Path
 from datetime import date, datetime
+from typing import Callable
 
 from app.media_processing.loader import load_day_media
+from app.media_processing.thumbnails import (
+    build_thumbnails,
+    ensure_day_thumbnails,
+    prune_thumbnail_cache,
+)
 from app.media_processing.vision import caption_day_media
 from app.story_engine.story_generator import build_day_story
 from app.story_engine.trailer_script import build_trailer_script
 from app.video_composer.composer import render_trailer
+from app.video_composer.proxies import ensure_day_proxies
+from app.video_composer.hls import package_hls
+from app.video_composer.settings import FPS, HLS_ENABLED
+from app.utils.helpers import MEDIA_EXTS
+from app.utils.metrics import RENDER_FPS, span
 from fastapi import UploadFile, File
 
+log = logging.getLogger("app.main")
+
 # 🔥 Use the SAME folder Flutter uses
 MEDIA_ROOT = Path("day_media")
 MEDIA_ROOT.mkdir(parents=True, exist_ok=True)
@@ -33,36 +49,140 @@ def get_wrapup_output_path(day: str | None = None) -> Path:
     return STATIC_DIR / f"timecapsule_{day}.mp4"
 
 
+def get_wrapup_hls_dir(day: str | None = None) -> Path:
+    if day is None:
+        day = date.today().isoformat()
+    return STATIC_DIR / "hls" / day
+
+
+def list_media_days() -> list[str]:
+    """Every day folder under MEDIA_ROOT (YYYY-MM-DD names only), oldest first."""
+    days = []
+    for d in MEDIA_ROOT.iterdir():
+        if not d.is_dir():
+            continue
+        try:
+            date.fromisoformat(d.name)
+        except ValueError:
+            continue
+        days.append(d.name)
+    return sorted(days)
+
+
+def newest_media_mtime(day_dir: Path) -> float | None:
+    """mtime of the most recently changed media file in day_dir, if any."""
+    newest = None
+    for dirpath, dirnames, filenames in os.walk(day_dir):
+        # .proxies, .manifest etc. are derived from the media, not media
+        dirnames[:] = [d for d in dirnames if not d.startswith(".")]
+        for name in filenames:
+            if Path(name).suffix.lower() not in MEDIA_EXTS:
+                continue
+            mtime = os.stat(os.path.join(dirpath, name)).st_mtime
+            if newest is None or mtime > newest:
+                newest = mtime
+    return newest
+
+
+def wrapup_is_stale(day: str) -> bool:
+    """
+    True when `day` has media and its wrap-up is missing or older than the
+    newest media file, i.e. rendering it again would change the result.
+    """
+    day_dir = MEDIA_ROOT / day
+    if not day_dir.is_dir():
+        return False
+    newest = newest_media_mtime(day_dir)
+    if newest is None:
+        return False
+    out = get_wrapup_output_path(day)
+    try:
+        return out.stat().st_mtime < newest
+    except FileNotFoundError:
+        return True
+
+
 def run_daily_wrapup(
     output_path: Path | None = None,
     day: str | None = None,
+    progress: Callable[[str, float], None] | None = None,
+    force_new_poem: bool = False,
 ) -> str:
+    """
+    Build the wrap-up video for `day`.
+
+    `progress(stage, fraction)` is called as the pipeline moves through
+    loading -> captioning -> story -> rendering (used by the job queue).
+    """
+    def report(stage: str, fraction: float) -> None:
+        if progress is not None:
+            progress(stage, fraction)
 
     day_dir = get_day_dir(day)
 
     if output_path is None:
         output_path = get_wrapup_output_path(day)
 
-    print(f"⏱ Loading media from: {day_dir}")
+    log.info("Loading media", extra={"day_dir": str(day_dir)})
+    report("loading", 0.05)
 
-    media = load_day_media(day_dir)
+    with span("load_day_media") as fields:
+        media = load_day_media(day_dir)
+        fields["items"] = len(media)
 
     if not media:
-        print("No media found for this day.")
+        log.info("No media found for this day", extra={"day_dir": str(day_dir)})
         return ""
 
-    print(f"Found {len(media)} items")
+    report("captioning", 0.15)
+    with span("caption_day_media", items=len(media)):
+        captions = caption_day_media(media)
+    report("story", 0.45)
+    with span("build_day_story"):
+        story = build_day_story(captions, force_new_poem=force_new_poem)
+
+    with span("build_trailer_script") as fields:
+        script = build_trailer_script(
+            media,
+            title=story["title"],
+            poem=story["poem"]
+        )
+        fields["shots"] = len(script.shots)
+
+    # normally built at upload time; this only catches stragglers
+    report("proxies", 0.5)
+    with span("ensure_day_proxies"):
+        ensure_day_proxies(day_dir)
+        ensure_day_thumbnails(day_dir)
+
+    report("rendering", 0.55)
+    with span("render_trailer", shots=len(script.shots)) as fields:
+        started = time.perf_counter()
+        render_trailer(script, output_path)
+        fps = script.total_duration * FPS / max(time.perf_counter() - started, 1e-6)
+        RENDER_FPS.observe(fps)
+        fields["render_fps"] = round(fps, 1)
+
+    # poster for the past-days list
+    build_thumbnails(output_path, force=True)
+    prune_thumbnail_cache()
+
+    if HLS_ENABLED:
+        report("packaging", 0.95)
+        with span("package_hls"):
+            package_hls(output_path, get_wrapup_hls_dir(day))
+    report("done", 1.0)
+
+    log.info("Wrap-up done", extra={"output": str(output_path)})
+    return str(output_path)
 
-    captions = caption_day_media(media)
-    story = build_day_story(captions)
 
-    script = build_trailer_script(
-        media,
-        title=story["title"],
-        poem=story["poem"]
-    )
+if __name__ == "__main__":
+    import sys
 
-    render_trailer(script, output_path)
+    from app.utils.logs import configure_logging
 
-    print("Wrap-up done ->", output_path)
-    return str(output_path)
+    # python main.py [YYYY-MM-DD]  (default: today)
+    configure_logging()
+    target_day = sys.argv[1] if len(sys.argv) > 1 else None
+    run_daily_wrapup(output_path=get_wrapup_output_path(target_day), day=target_day)
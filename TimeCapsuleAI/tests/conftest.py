@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# the app is run from this directory (python main.py / uvicorn api:app)
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
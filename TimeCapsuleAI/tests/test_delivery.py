@@ -0,0 +1,176 @@
+import os
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("fastapi")
+from starlette.requests import Request  # noqa: E402
+
+from app.server.delivery import (  # noqa: E402
+    IMMUTABLE,
+    REVALIDATE,
+    RangeNotSatisfiable,
+    _iter_file,
+    file_version,
+    parse_range,
+    resolve_static,
+    serve_file,
+)
+
+
+def _request(method="GET", **headers) -> Request:
+    raw = [(k.replace("_", "-").lower().encode(), v.encode()) for k, v in headers.items()]
+    return Request({"type": "http", "method": method, "headers": raw})
+
+
+@pytest.fixture
+def media(tmp_path) -> Path:
+    path = tmp_path / "clip.mp4"
+    path.write_bytes(bytes(range(10)))
+    return path
+
+
+# ---------- parse_range ----------
+
+@pytest.mark.parametrize(
+    "header, expected",
+    [
+        ("bytes=0-3", (0, 3)),
+        ("bytes=5-", (5, 9)),          # open-ended
+        ("bytes=-4", (6, 9)),          # suffix: last 4 bytes
+        ("bytes=-50", (0, 9)),         # suffix longer than the file
+        ("bytes=8-100", (8, 9)),       # end clamped to the file
+        ("bytes=2-3, 5-6", (2, 3)),    # only the first range is served
+        ("items=0-3", None),           # other units: send it all
+        ("bytes=abc", None),
+        ("bytes=x-3", None),
+    ],
+)
+def test_parse_range(header, expected):
+    assert parse_range(header, 10) == expected
+
+
+@pytest.mark.parametrize(
+    "header, size",
+    [
+        ("bytes=10-", 10),   # start past the end
+        ("bytes=10-12", 10),
+        ("bytes=5-2", 10),   # end before start
+        ("bytes=-0", 10),
+        ("bytes=0-", 0),     # nothing to serve in an empty file
+        ("bytes=-5", 0),
+    ],
+)
+def test_parse_range_not_satisfiable(header, size):
+    with pytest.raises(RangeNotSatisfiable):
+        parse_range(header, size)
+
+
+# ---------- serve_file ----------
+
+def test_serve_whole_file(media):
+    resp = serve_file(_request(), media)
+    assert resp.status_code == 200
+    assert resp.headers["content-length"] == "10"
+    assert resp.headers["accept-ranges"] == "bytes"
+    assert resp.headers["cache-control"] == REVALIDATE
+
+
+def test_serve_range(media):
+    resp = serve_file(_request(range="bytes=-4"), media)
+    assert resp.status_code == 206
+    assert resp.headers["content-range"] == "bytes 6-9/10"
+    assert resp.headers["content-length"] == "4"
+    assert b"".join(_iter_file(media, 6, 4)) == bytes(range(6, 10))
+
+
+def test_serve_range_not_satisfiable(media):
+    resp = serve_file(_request(range="bytes=10-"), media)
+    assert resp.status_code == 416
+    assert resp.headers["content-range"] == "bytes */10"
+
+
+def test_serve_empty_file(tmp_path):
+    empty = tmp_path / "empty.mp4"
+    empty.write_bytes(b"")
+    resp = serve_file(_request(), empty)
+    assert resp.status_code == 200
+    assert resp.headers["content-length"] == "0"
+    assert serve_file(_request(range="bytes=0-"), empty).status_code == 416
+
+
+def test_if_range_match_serves_range(media):
+    etag = serve_file(_request(), media).headers["etag"]
+    resp = serve_file(_request(range="bytes=0-1", if_range=etag), media)
+    assert resp.status_code == 206
+
+
+def test_if_range_mismatch_serves_whole_file(media):
+    resp = serve_file(_request(range="bytes=0-1", if_range='"stale"'), media)
+    assert resp.status_code == 200
+    assert "content-range" not in resp.headers
+    assert resp.headers["content-length"] == "10"
+
+
+def test_if_none_match_is_304(media):
+    etag = serve_file(_request(), media).headers["etag"]
+    assert serve_file(_request(if_none_match=etag), media).status_code == 304
+
+
+def test_head_has_no_body(media):
+    resp = serve_file(_request("HEAD", range="bytes=0-1"), media)
+    assert resp.status_code == 206
+    assert resp.body == b""
+
+
+def test_immutable_only_for_current_version(media):
+    current = file_version(media.stat())
+    assert serve_file(_request(), media, version=current).headers["cache-control"] == IMMUTABLE
+    assert serve_file(_request(), media, version="0-0").headers["cache-control"] == REVALIDATE
+    assert serve_file(_request(), media).headers["cache-control"] == REVALIDATE
+
+
+# ---------- resolve_static ----------
+
+@pytest.fixture
+def site(tmp_path) -> Path:
+    for rel in ("day_media/2025-01-01/a.jpg", "static/out.mp4", ".env"):
+        path = tmp_path / rel
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(b"x")
+    return tmp_path
+
+
+def _allowed(root: Path):
+    return (root / "day_media", root / "static")
+
+
+def test_resolve_static_allowed(site):
+    assert resolve_static("day_media/2025-01-01/a.jpg", site, _allowed(site)) == (
+        site / "day_media/2025-01-01/a.jpg"
+    ).resolve()
+    assert resolve_static("static/out.mp4", site, _allowed(site)) is not None
+
+
+@pytest.mark.parametrize(
+    "rel_path",
+    [
+        ".env",                              # inside root, outside allowed folders
+        "static/../.env",
+        "day_media/../../etc/passwd",
+        "static/missing.mp4",
+        "static",                            # a folder, not a file
+    ],
+)
+def test_resolve_static_rejects(site, rel_path):
+    assert resolve_static(rel_path, site, _allowed(site)) is None
+
+
+def test_resolve_static_rejects_absolute(site):
+    outside = site.parent / f"{site.name}-outside.txt"
+    outside.write_bytes(b"x")
+    try:
+        assert resolve_static(str(outside), site, _allowed(site)) is None
+        assert resolve_static(os.path.abspath(site / ".env"), site, _allowed(site)) is None
+    finally:
+        outside.unlink()
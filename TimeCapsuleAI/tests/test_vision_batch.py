@@ -0,0 +1,113 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+
+vision = pytest.importorskip("app.media_processing.vision")
+
+
+# ---------- _parse_batch_captions ----------
+
+def test_parse_plain_list():
+    text = json.dumps([{"index": 2, "caption": " b "}, {"index": 1, "caption": "a"}])
+    assert vision._parse_batch_captions(text, 2) == ["a", "b"]
+
+
+def test_parse_captions_wrapper():
+    text = json.dumps({"captions": [{"index": 1, "caption": "a"}]})
+    assert vision._parse_batch_captions(text, 2) == ["a", None]
+
+
+def test_parse_numeric_string_index():
+    text = json.dumps([{"index": "2", "caption": "b"}, {"index": "x", "caption": "c"}])
+    assert vision._parse_batch_captions(text, 2) == [None, "b"]
+
+
+def test_parse_rejects_bool_index():
+    # True == 1 in Python; a boolean is not a photo number
+    text = json.dumps([{"index": True, "caption": "a"}])
+    assert vision._parse_batch_captions(text, 1) == [None]
+
+
+def test_parse_keeps_first_duplicate():
+    text = json.dumps([{"index": 1, "caption": "first"}, {"index": 1, "caption": "second"}])
+    assert vision._parse_batch_captions(text, 1) == ["first"]
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "not json",
+        json.dumps({"other": []}),
+        json.dumps([1, "a", None]),
+        json.dumps([{"index": 0, "caption": "a"}, {"index": 3, "caption": "b"}]),
+        json.dumps([{"index": 1, "caption": "  "}, {"index": 2, "caption": 5}]),
+    ],
+)
+def test_parse_malformed_entries_stay_none(text):
+    assert vision._parse_batch_captions(text, 2) == [None, None]
+
+
+# ---------- _caption_images ----------
+
+@pytest.fixture
+def batching(monkeypatch):
+    """Fake payloads and Gemini calls; records batch sizes and single calls."""
+    calls = SimpleNamespace(batches=[], singles=[], fail_above=None, drop=set())
+
+    def fake_batch(payloads):
+        calls.batches.append(len(payloads))
+        if calls.fail_above is not None and len(payloads) > calls.fail_above:
+            raise RuntimeError("request too large")
+        return [None if p.decode() in calls.drop else f"batch:{p.decode()}" for p in payloads]
+
+    def fake_single(path, content_hash=None):
+        calls.singles.append(path.name)
+        return f"single:{path.name}"
+
+    monkeypatch.setattr(vision, "image_payload", lambda path, h=None: path.name.encode())
+    monkeypatch.setattr(vision, "describe_images_batch", fake_batch)
+    monkeypatch.setattr(vision, "describe_image_path", fake_single)
+    monkeypatch.setattr(vision, "_BATCH_SIZE", vision._AdaptiveBatchSize(4))
+    monkeypatch.setattr(vision, "CAPTION_BATCH_MAX_BYTES", 1024)
+    return calls
+
+
+def _group(n):
+    return [(SimpleNamespace(path=f"p{i}.jpg"), None) for i in range(n)]
+
+
+def test_caption_images_one_batch(batching):
+    assert vision._caption_images(_group(3)) == ["batch:p0.jpg", "batch:p1.jpg", "batch:p2.jpg"]
+    assert batching.batches == [3]
+    assert batching.singles == []
+
+
+def test_caption_images_missing_answers_fall_back_to_single(batching):
+    batching.drop = {"p1.jpg"}
+    assert vision._caption_images(_group(3)) == ["batch:p0.jpg", "single:p1.jpg", "batch:p2.jpg"]
+    assert batching.singles == ["p1.jpg"]
+
+
+def test_caption_images_shrinks_and_retries(batching):
+    batching.fail_above = 2
+    captions = vision._caption_images(_group(4))
+    assert captions == [f"batch:p{i}.jpg" for i in range(4)]
+    # the failed batch of 4 is retried as two batches of 2
+    assert batching.batches == [4, 2, 2]
+    assert batching.singles == []
+
+
+def test_caption_images_gives_up_on_batching(batching):
+    batching.fail_above = 1
+    captions = vision._caption_images(_group(3))
+    assert captions == [f"single:p{i}.jpg" for i in range(3)]
+    # 4 -> 2 -> 1: once the size reaches one photo, each is sent on its own
+    assert batching.batches == [3, 2]
+    assert vision._BATCH_SIZE.value == 1
+
+
+def test_caption_images_respects_byte_budget(batching, monkeypatch):
+    monkeypatch.setattr(vision, "CAPTION_BATCH_MAX_BYTES", 2 * len(b"p0.jpg"))
+    vision._caption_images(_group(4))
+    assert batching.batches == [2, 2]